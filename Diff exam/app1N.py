@@ -7,7 +7,6 @@ import requests
 import json
 from datetime import datetime
 import stripe
-import base64
 from urllib.parse import quote_plus
 
 # -------------------------------------------------
@@ -224,10 +223,7 @@ def create_checkout(trees, email, note):
         return None
 
 def export_csv(df):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="ecogighub_impact.csv" class="share-btn">Download CSV</a>'
-    return href
+    st.download_button("Download CSV", df.to_csv(index=False).encode(), file_name="ecogighub_impact.csv", mime="text/csv")
 
 # -------------------------------------------------
 # SIDEBAR
@@ -407,7 +403,7 @@ with col2:
             <a href="https://twitter.com/intent/tweet?text={quote_plus(share_text)}" target="_blank" class="share-btn">Twitter</a>
             <a href="https://www.linkedin.com/shareArticle?mini=true&url={BASE_URL}&title={quote_plus(share_text)}" target="_blank" class="share-btn">LinkedIn</a>
             ''', unsafe_allow_html=True)
-            st.markdown(export_csv(df), unsafe_allow_html=True)
+            export_csv(df)
 
 # -------------------------------------------------
 # PAYMENT SUCCESS
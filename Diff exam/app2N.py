@@ -7,7 +7,6 @@ import requests
 import json
 from datetime import datetime
 import stripe
-import base64
 from urllib.parse import quote_plus
 
 # -------------------------------------------------
@@ -256,10 +255,7 @@ def create_checkout_with_project(trees, email, note, project_id, project_name):
         return None
 
 def export_csv(df):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="ecogighub_impact.csv" class="share-btn">Download CSV</a>'
-    return href
+    st.download_button("Download CSV", df.to_csv(index=False).encode(), file_name="ecogighub_impact.csv", mime="text/csv")
 
 # -------------------------------------------------
 # SIDEBAR
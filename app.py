@@ -2,13 +2,27 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import stripe
-import requests
 from datetime import datetime
-import base64
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
 import urllib.parse
+import atexit
 from supabase import create_client, Client
+from ecogighub.artifacts import ArtifactStore
+from ecogighub.basket import ColumnarBasket, paginate
+from ecogighub.bulk import bulk_footprint, read_purchases, stream_footprint
+from ecogighub.cache import TTLCache
+from ecogighub.catalog import DEFAULT_PATH as CATALOG_PATH, load_catalog
+from ecogighub.certificates import certificate_pdf
+from ecogighub.checkout import PAID, CheckoutLinks, SessionVerifier
+from ecogighub.core import TREE_CO2_YEAR, check_badges
+from ecogighub.fulfillment import DONE, FAILED, PENDING, FulfillmentLedger
+from ecogighub.jobs import FAILED as JOB_FAILED, JobQueue
+from ecogighub.leaderboard import LeaderboardCache, LeaderboardRepository, LeaderboardWriter
+from ecogighub.providers import EcologiClient, WaldoniaClient
+from ecogighub.recommend import MAX_FRONTIER, recommend
+from ecogighub.render import RENDER_TTL, EcoTableRenderer, content_hash
+from ecogighub.scenarios import pareto_frontier
+from ecogighub.webhook import enqueue_fulfillment
+from ecogighub.worker import FulfillmentWorkerPool
 
 # -------------------------------------------------
 # CONFIG
@@ -21,19 +35,25 @@ BASE_URL = st.secrets.get("base_url", "http://localhost:8501")
 SUCCESS_URL = f"{BASE_URL}/?session_id={{CHECKOUT_SESSION_ID}}"
 CANCEL_URL = BASE_URL
 
-TREE_CO2_YEAR = 20.0
-
 # Supabase
 SUPABASE_URL = st.secrets.get("SUPABASE_URL")
 SUPABASE_KEY = st.secrets.get("SUPABASE_KEY")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
+LEADERBOARD_TTL = float(st.secrets.get("leaderboard_ttl", 30))
+LEADERBOARD_PAGE = 10
 
 # API
-WALDONIA_BASE = "https://api.waldonia.com/v1"
+WALDONIA_BASE = st.secrets.get("WALDONIA_BASE", "https://api.waldonia.com/v1")
 WALDONIA_KEY = st.secrets.get("WALDONIA_API_KEY", "sandbox_key")
-ECOLOGI_BASE = "https://publicapi.ecologi.com/v1"
+ECOLOGI_BASE = st.secrets.get("ECOLOGI_BASE", "https://publicapi.ecologi.com/v1")
 ECOLOGI_KEY = st.secrets.get("ECOLOGI_API_KEY", "sandbox_key")
 ECOLOGI_USERNAME = st.secrets.get("ECOLOGI_USERNAME", "demo_user")
+LEDGER_PATH = st.secrets.get("ledger_path", ".data/fulfillment.sqlite3")
+QUEUE_PATH = st.secrets.get("queue_path", ".data/jobs.sqlite3")
+# Fulfillment threads inside the Streamlit process; set to 0 when `python -m ecogighub.worker` runs separately.
+INLINE_WORKERS = int(st.secrets.get("inline_workers", 2))
+ARTIFACT_DIR = st.secrets.get("artifact_dir", ".data/artifacts")
+BASKET_PAGE = int(st.secrets.get("basket_page", 50))
 
 # -------------------------------------------------
 # STYLES
@@ -62,6 +82,7 @@ st.markdown("""
     td {padding:12px 14px; border-bottom:1px solid #eee;}
     .buy-btn {background:#145A32; color:white; padding:6px 14px; border-radius:12px; font-size:0.85rem; text-decoration:none; font-weight:600;}
     .buy-btn:hover {background:#0e3f24;}
+    .buy-pending {opacity:0.55; cursor:default;}
     .badge-card {background: linear-gradient(135deg, #e8f5e8, #d0f0c0); border-radius:16px; padding:1rem; text-align:center; box-shadow: var(--shadow); border: 1px solid #a8e6a8;}
     .badge-title {font-weight:800; color:#145A32; margin:0.5rem 0;}
     .badge-desc {font-size:0.9rem; color:#0e3f24;}
@@ -71,66 +92,24 @@ st.markdown("""
 # -------------------------------------------------
 # DATA
 # -------------------------------------------------
-products = {
-    "Cotton T-Shirt": {"regular": 9.0, "eco": 4.5, "price": 13.0},
-    "Pair of Jeans": {"regular": 33.4, "bio": 16.7, "price": 49.0},
-    "Leather Shoes": {"regular": 16.0, "vegan": 7.0, "price": 89.0},
-    "Wool Sweater": {"regular": 18.0, "recycled": 9.0, "price": 60.0},
-    "Beef Burger (150g)": {"regular": 4.0, "plant-based": 1.0, "price": 6.0},
-    "Cup of Coffee (200ml)": {"regular": 0.05, "fair-trade": 0.03, "price": 3.0},
-    "Bottle of Milk (1L)": {"regular": 3.0, "oat": 0.9, "price": 2.0},
-    "Smartphone": {"regular": 70.0, "refurbished": 15.0, "price": 699.0},
-}
-
-gigs = {
-    "House Cleaning (1h)": {"standard": 0.5, "green": 0.1, "price": 25.0},
-    "Lawn Mowing (30min)": {"gas": 1.2, "electric": 0.3, "price": 15.0},
-    "Repair Service (1h)": {"standard": 0.8, "eco": 0.4, "price": 40.0},
-}
-
-REQUIRED_COLS = [
-    "Category", "Item", "Variant", "Quantity",
-    "Unit CO₂ Regular", "Unit CO₂ Eco", "Unit Price",
-    "CO₂ Regular", "CO₂ Eco", "Savings", "Total $"
-]
+@st.cache_resource
+def get_catalog():
+    return load_catalog(st.secrets.get("catalog_path", CATALOG_PATH))
+
+catalog = get_catalog()
 
 if "basket" not in st.session_state:
-    st.session_state.basket = pd.DataFrame(columns=REQUIRED_COLS).astype({
-        "Quantity": "int64",
-        "Unit CO₂ Regular": "float64",
-        "Unit CO₂ Eco": "float64",
-        "Unit Price": "float64",
-        "CO₂ Regular": "float64",
-        "CO₂ Eco": "float64",
-        "Savings": "float64",
-        "Total $": "float64"
-    }, errors='ignore')
+    st.session_state.basket = ColumnarBasket(catalog)
 
 if "impacts" not in st.session_state:
     st.session_state.impacts = []
 
+if "fulfilled" not in st.session_state:
+    st.session_state.fulfilled = set()
+
 # -------------------------------------------------
 # BADGES SYSTEM
 # -------------------------------------------------
-BADGES = [
-    {"name": "First Step", "icon": "Leaf", "threshold": 10, "desc": "Saved 10 kg CO₂"},
-    {"name": "Eco Warrior", "icon": "trophy", "threshold": 100, "desc": "Saved 100 kg CO₂"},
-    {"name": "Tree Hugger", "icon": "tree", "threshold": 5, "desc": "Planted 5 trees"},
-    {"name": "Carbon Killer", "icon": "fire", "threshold": 1000, "desc": "Saved 1 ton CO₂"},
-    {"name": "Viral Hero", "icon": "share", "threshold": 3, "desc": "Invited 3 friends"},
-]
-
-def check_badges(total_save, trees_planted, shares=0):
-    earned = []
-    for badge in BADGES:
-        if (badge["threshold"] == 10 and total_save >= 10) or \
-           (badge["threshold"] == 100 and total_save >= 100) or \
-           (badge["threshold"] == 5 and trees_planted >= 5) or \
-           (badge["threshold"] == 1000 and total_save >= 1000) or \
-           (badge["threshold"] == 3 and shares >= 3):
-            earned.append(badge)
-    return earned
-
 def display_badge(badge):
     st.markdown(f"""
     <div class="badge-card">
@@ -142,51 +121,40 @@ def display_badge(badge):
 # -------------------------------------------------
 # FUNCTIONS
 # -------------------------------------------------
-def variant_badge(variant):
-    eco_keys = ["eco","bio","vegan","plant-based","oat","fair-trade","local","reusable","electric","green","low-voc","sustainable"]
-    if any(k in str(variant).lower() for k in eco_keys):
-        return f'<span class="eco-badge">Eco</span> {variant}'
-    else:
-        return f'<span class="reg-badge">Regular</span> {variant}'
-
 def add_item(category, item, variant, qty):
-    try:
-        data = products if category == "Products" else gigs
-        d = data.get(item, {})
-        if not d: return st.session_state.basket
-        reg_key = next((k for k in ["regular","standard"] if k in d), list(d.keys())[0])
-        unit_co2_reg = float(d.get(reg_key, 0))
-        unit_co2_eco = float(d.get(variant, 0))
-        unit_price = float(d.get("price", 0))
-        new_row = pd.DataFrame([{
-            "Category": category, "Item": item, "Variant": variant, "Quantity": int(qty),
-            "Unit CO₂ Regular": unit_co2_reg, "Unit CO₂ Eco": unit_co2_eco, "Unit Price": unit_price,
-            "CO₂ Regular": round(qty * unit_co2_reg, 3), "CO₂ Eco": round(qty * unit_co2_eco, 3),
-            "Savings": round(qty * (unit_co2_reg - unit_co2_eco), 3), "Total $": round(qty * unit_price, 2)
-        }])
-        return pd.concat([st.session_state.basket, new_row], ignore_index=True)
-    except: return st.session_state.basket
-
-def recalculate(df):
-    if df.empty: return pd.DataFrame(columns=REQUIRED_COLS)
-    df = df.copy()
-    for col in ["Quantity", "Unit CO₂ Regular", "Unit CO₂ Eco", "Unit Price"]:
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    df["Quantity"] = df["Quantity"].astype(int)
-    df["CO₂ Regular"] = (df["Quantity"] * df["Unit CO₂ Regular"]).round(3)
-    df["CO₂ Eco"] = (df["Quantity"] * df["Unit CO₂ Eco"]).round(3)
-    df["Savings"] = (df["CO₂ Regular"] - df["CO₂ Eco"]).round(3)
-    df["Total $"] = (df["Quantity"] * df["Unit Price"]).round(2)
-    return df[df["Quantity"] > 0].copy()
-
-def totals(df):
-    if df.empty: return 0, 0, 0, 0
-    return (
-        round(df["CO₂ Regular"].sum(), 2),
-        round(df["CO₂ Eco"].sum(), 2),
-        round(df["Savings"].sum(), 2),
-        round(df["Total $"].sum(), 2)
+    row = catalog.lookup(category, item, variant)
+    if row >= 0 and qty > 0:
+        st.session_state.basket.add(row, qty)
+    return st.session_state.basket
+
+def basket_view():
+    """Basket lines passing the "Filter & sort" controls, and the current page of them."""
+    basket = st.session_state.basket
+    category = st.session_state.get("view_category", "All")
+    view_rows = basket.select(
+        category=None if category == "All" else category,
+        min_savings=st.session_state.get("view_min_savings") or None,
+        max_price=st.session_state.get("view_max_price") or None,
+        sort=st.session_state.get("view_sort", "Added").lower(),
+        descending=st.session_state.get("view_desc", False),
     )
+    page_rows, page, pages = paginate(view_rows, st.session_state.get("view_page", 1), BASKET_PAGE)
+    return view_rows, page_rows, page, pages
+
+# Uploads above this size are streamed in chunks for totals only, instead of loaded whole.
+BULK_STREAM_BYTES = 50 * 1024 * 1024
+
+# Keyed on the uploader's file_id: the leading underscore keeps Streamlit from hashing the file's bytes.
+@st.cache_data(max_entries=8)
+def import_purchases(_upload, file_id, name):
+    _upload.seek(0)
+    return bulk_footprint(read_purchases(_upload, name), catalog)
+
+@st.cache_data(max_entries=8)
+def stream_purchases(_upload, file_id, name):
+    _upload.seek(0)
+    result = stream_footprint(_upload, catalog, name=name)
+    return result.summary(), result.breakdown("category")
 
 def create_checkout(name, variant, qty, price, email):
     if price <= 0 or qty <= 0: return None
@@ -209,6 +177,81 @@ def create_checkout(name, variant, qty, price, email):
         return session.url
     except: return None
 
+def get_checkout_links():
+    # Checkout Sessions are single-use, so each visitor gets their own links
+    if "checkout_links" not in st.session_state:
+        st.session_state.checkout_links = CheckoutLinks(create_checkout)
+    return st.session_state.checkout_links
+
+@st.cache_resource
+def get_eco_table():
+    return EcoTableRenderer()
+
+@st.cache_resource
+def get_whatif_cache():
+    return TTLCache(RENDER_TTL, maxsize=256)
+
+def whatif_frontier(df, basket_key):
+    """Pareto frontier of the basket, shared by reruns and sessions with the same basket."""
+    cache = get_whatif_cache()
+    frontier = cache.get(("frontier", basket_key))
+    if frontier is None:
+        frontier = cache.set(("frontier", basket_key), pareto_frontier(df, catalog, max_points=MAX_FRONTIER))
+    return frontier
+
+def whatif_recommend(df, basket_key, budget):
+    cache = get_whatif_cache()
+    # wrapped in a tuple so "nothing fits" (None) is cached too
+    entry = cache.get(("recommend", basket_key, budget))
+    if entry is None:
+        entry = cache.set(("recommend", basket_key, budget), (recommend(df, catalog, budget),))
+    return entry[0]
+
+def paged_dataframe(frame, key):
+    """Show ``frame`` a ``BASKET_PAGE`` of rows at a time."""
+    page_rows, page, pages = paginate(frame.index, st.session_state.get(key, 1), BASKET_PAGE)
+    if pages > 1:
+        st.session_state[key] = page
+        st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=key)
+    st.dataframe(frame.loc[page_rows], use_container_width=True, hide_index=True)
+
+@st.cache_resource
+def get_leaderboard_repo():
+    return LeaderboardRepository(supabase)
+
+def fetch_leaderboard():
+    return get_leaderboard_repo().page(LEADERBOARD_PAGE)[0]
+
+@st.cache_resource
+def get_leaderboard_cache():
+    return LeaderboardCache(fetch_leaderboard, ttl=LEADERBOARD_TTL)
+
+@st.cache_resource
+def get_rank_cache():
+    return TTLCache(LEADERBOARD_TTL)
+
+# cached for names without a rank, so they are not looked up again on every rerun
+UNRANKED = "unranked"
+
+def cached_rank(user_name):
+    rank = get_rank_cache().get(user_name)
+    if rank is None:
+        rank = get_rank_cache().set(user_name, get_leaderboard_repo().rank_of(user_name) or UNRANKED)
+    return None if rank == UNRANKED else rank
+
+def upsert_leaderboard(rows):
+    supabase.table("leaderboard").upsert(rows, on_conflict="user_name").execute()
+
+def on_leaderboard_flush():
+    get_leaderboard_cache().invalidate()
+    get_rank_cache().clear()
+
+@st.cache_resource
+def get_leaderboard_writer():
+    writer = LeaderboardWriter(upsert_leaderboard, flush_interval=float(st.secrets.get("leaderboard_flush_secs", 2)), on_flush=on_leaderboard_flush)
+    atexit.register(writer.close)
+    return writer
+
 def create_stripe_session(amount_cents, description, metadata=None):
     if amount_cents <= 0: return None
     try:
@@ -232,54 +275,60 @@ def create_stripe_session(amount_cents, description, metadata=None):
         st.error(f"Payment error: {e}")
         return None
 
-def verify_stripe_session(session_id):
-    try:
-        session = stripe.checkout.Session.retrieve(session_id)
-        return session.payment_status == 'paid'
-    except: return False
+@st.cache_resource
+def get_session_verifier():
+    return SessionVerifier(stripe.checkout.Session.retrieve)
 
-@st.cache_data(ttl=3600)
-def waldonia_plant_trees(trees, note, metadata):
-    if trees <= 0: return None
-    try:
-        url = f"{WALDONIA_BASE}/orders"
-        headers = {"Authorization": f"Bearer {WALDONIA_KEY}", "Content-Type": "application/json"}
-        payload = {"tree_count": trees, "idempotency_key": f"order_{datetime.now().timestamp()}", "note": note, "metadata": metadata}
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        return response.json() if response.status_code == 201 else None
-    except: return None
+def paid_session(session_id):
+    """The verified session's details (status, metadata, email) if it is paid, else ``None``."""
+    details = get_session_verifier().details(session_id)
+    return details if details and details["status"] == PAID else None
 
-@st.cache_data(ttl=3600)
-def ecologi_offset(tonnes, action="offset"):
-    if tonnes <= 0: return None
-    try:
-        url = f"{ECOLOGI_BASE}/{action}"
-        headers = {"Authorization": f"Bearer {ECOLOGI_KEY}", "Content-Type": "application/json"}
-        payload = {"tonnes": tonnes, "username": ECOLOGI_USERNAME}
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        return response.json() if response.status_code == 200 else None
-    except: return None
+@st.cache_resource
+def get_waldonia():
+    return WaldoniaClient(WALDONIA_BASE, WALDONIA_KEY)
+
+@st.cache_resource
+def get_ecologi():
+    return EcologiClient(ECOLOGI_BASE, ECOLOGI_KEY, ECOLOGI_USERNAME)
+
+@st.cache_resource
+def get_ledger():
+    return FulfillmentLedger(LEDGER_PATH)
+
+@st.cache_resource
+def get_job_queue():
+    return JobQueue(QUEUE_PATH)
+
+@st.cache_resource
+def start_inline_workers():
+    """Drain the fulfillment queue in-process (including webhook jobs) from the first page load on."""
+    if INLINE_WORKERS <= 0:
+        return None
+    pool = FulfillmentWorkerPool(JobQueue(QUEUE_PATH), get_ledger(), get_waldonia(), get_ecologi(), workers=INLINE_WORKERS).start()
+    atexit.register(pool.stop)
+    return pool
+
+start_inline_workers()
+
+@st.fragment(run_every=2)
+def await_fulfillment(session_id):
+    record = get_ledger().get(session_id)
+    job = get_job_queue().get(session_id)
+    if (record and record["status"] != PENDING) or (job and job["status"] == JOB_FAILED):
+        st.rerun()
+    st.info("Placing your order with the provider… this updates automatically.")
+
+@st.cache_resource
+def get_artifacts():
+    return ArtifactStore(ARTIFACT_DIR)
 
 def generate_pdf_cert(trees, total_save, api_name):
-    img = Image.new('RGB', (900, 636), color=(248, 252, 248))
-    draw = ImageDraw.Draw(img)
-    try:
-        font_title = ImageFont.truetype("arialbd.ttf", 48)
-        font_body = ImageFont.truetype("arial.ttf", 28)
-    except:
-        font_title = ImageFont.load_default()
-        font_body = font_title
-    draw.text((80, 100), "EcoGigHub Impact Certificate", fill=(20, 90, 50), font=font_title)
-    draw.text((80, 200), f"Trees Planted: {trees}", fill=(0, 100, 0), font=font_body)
-    draw.text((80, 260), f"CO₂ Saved: {total_save:,.0f} kg", fill=(0, 100, 0), font=font_body)
-    draw.text((80, 320), f"Provider: {api_name}", fill=(0, 100, 0), font=font_body)
-    draw.text((80, 380), f"Date: {datetime.now():%B %d, %Y}", fill=(0, 100, 0), font=font_body)
-    draw.text((80, 460), "Thank you for choosing sustainability!", fill=(0, 120, 0), font=font_body)
-    buf = BytesIO()
-    img.save(buf, format="PDF")
-    buf.seek(0)
-    b64 = base64.b64encode(buf.read()).decode()
-    return f'<a href="data:application/pdf;base64,{b64}" download="certificate.pdf" style="color:#145A32; font-weight:600;">Download PDF Certificate</a>'
+    return get_artifacts().put(certificate_pdf(trees, total_save, api_name), ".pdf")
+
+def download_artifact(label, name, file_name, mime, key):
+    with get_artifacts().open(name) as f:
+        st.download_button(label, f, file_name=file_name, mime=mime, key=key)
 
 # -------------------------------------------------
 # MAIN
@@ -291,10 +340,9 @@ col_left, col_right = st.columns([1, 3])
 
 with col_left:
     st.header("Add to Basket")
-    category = st.selectbox("Category", ["Products", "Gig Services"], key="cat_select")
-    data = products if category == "Products" else gigs
-    item = st.selectbox("Item", list(data.keys()), key="item_select")
-    variants = [k for k in data[item].keys() if k != "price"]
+    category = st.selectbox("Category", catalog.categories(), key="cat_select")
+    item = st.selectbox("Item", catalog.items(category), key="item_select")
+    variants = catalog.variants(category, item)
     variant = st.selectbox("Variant", variants, format_func=lambda x: x.title(), key="variant_select")
     qty = st.number_input("Quantity", min_value=1, value=1, step=1, key="qty_input")
 
@@ -303,30 +351,67 @@ with col_left:
         st.success(f"Added {qty} × {item}")
         st.balloons()
 
+    with st.expander("Bulk Import"):
+        upload = st.file_uploader("Purchase history (item, variant, quantity)", type=["csv", "parquet"], key="bulk_upload")
+        if upload is not None and upload.size > BULK_STREAM_BYTES:
+            try:
+                summary, by_category = stream_purchases(upload, upload.file_id, upload.name)
+            except ValueError as e:
+                st.error(f"Could not read file: {e}")
+            else:
+                st.metric("Lines", f"{summary['lines']:,}")
+                st.metric("CO₂ saved", f"{summary['savings']:,} kg")
+                st.dataframe(by_category, hide_index=True)
+                st.caption("Large file: showing totals only. Split it to add lines to the basket.")
+        elif upload is not None:
+            try:
+                imported, imported_totals, unmatched = import_purchases(upload, upload.file_id, upload.name)
+            except ValueError as e:
+                st.error(f"Could not read file: {e}")
+            else:
+                st.metric("Lines matched", f"{len(imported):,}")
+                st.metric("CO₂ saved", f"{imported_totals['savings']:,} kg")
+                if len(unmatched):
+                    st.warning(f"{len(unmatched):,} lines were skipped (not in the catalog or zero quantity).")
+                if len(imported) and st.button("Add All to Basket", key="btn_bulk_add"):
+                    st.session_state.basket.extend(imported["Catalog Row"], imported["Quantity"])
+                    st.success(f"Added {len(imported):,} lines")
+
     if not st.session_state.basket.empty:
         st.markdown("### Edit Basket")
+        with st.expander("Filter & sort"):
+            f1, f2, f3 = st.columns(3)
+            f1.selectbox("Category", ["All"] + catalog.categories(), key="view_category")
+            f2.selectbox("Sort by", ["Added", "Savings", "Price", "Category"], key="view_sort")
+            f3.toggle("Descending", key="view_desc")
+            f4, f5 = st.columns(2)
+            f4.number_input("Min. saved (kg)", min_value=0.0, step=1.0, key="view_min_savings")
+            f5.number_input("Max. price ($)", min_value=0.0, step=10.0, help="0 = no limit", key="view_max_price")
+        view_rows, page_rows, page, pages = basket_view()
+        if pages > 1:
+            # clamp before the widget is created, in case the filtered view shrank
+            st.session_state.view_page = page
+            st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="view_page")
         edited = st.data_editor(
-            st.session_state.basket[["Item", "Variant", "Quantity"]].copy(),
+            st.session_state.basket.to_frame(page_rows)[["Item", "Variant", "Quantity"]],
             use_container_width=True,
             hide_index=True,
             column_config={"Quantity": st.column_config.NumberColumn("Qty", min_value=0, step=1, format="%d")},
             key="basket_editor"
         )
-        df_tmp = st.session_state.basket.copy()
-        df_tmp.loc[edited.index, "Quantity"] = edited["Quantity"]
-        df_tmp = df_tmp[df_tmp["Quantity"] > 0].copy()
-        st.session_state.basket = recalculate(df_tmp)
+        st.session_state.basket.set_quantities(pd.to_numeric(edited["Quantity"], errors='coerce').fillna(0), rows=page_rows)
+        st.session_state.basket.compact()
 
         if st.button("Clear Basket", key="btn_clear"):
-            st.session_state.basket = pd.DataFrame(columns=REQUIRED_COLS)
+            st.session_state.basket.clear()
             st.rerun()
 
 with col_right:
     if st.session_state.basket.empty:
         st.info("Add items to see your impact.")
     else:
-        df = recalculate(st.session_state.basket)
-        total_reg, total_eco, total_save, total_money = totals(df)
+        df = st.session_state.basket.to_frame()
+        total_reg, total_eco, total_save, total_money = st.session_state.basket.totals()
         trees_saved = total_save / TREE_CO2_YEAR
 
         # GREEN GAUGE
@@ -370,23 +455,76 @@ with col_right:
 
         # TABLE
         st.markdown("### Your Eco Choices")
-        table_html = '<table><thead><tr><th>Item</th><th>Choice</th><th>Qty</th><th>Saved</th><th>Price</th><th>Action</th></tr></thead><tbody>'
-        for idx, r in df.iterrows():
-            badge = variant_badge(r["Variant"])
-            buy_url = create_checkout(r["Item"], r["Variant"], int(r["Quantity"]), r["Unit Price"], "")
-            buy_btn = f'<a href="{buy_url}" target="_blank" class="buy-btn">Buy Now</a>' if buy_url else "—"
-            table_html += f'<tr><td>{r["Item"]}</td><td>{badge}</td><td>{int(r["Quantity"])}</td><td style="color:#145A32; font-weight:600;">{r["Savings"]:.1f}</td><td>${r["Total $"]:.2f}</td><td>{buy_btn}</td></tr>'
-        table_html += '</tbody></table>'
-        st.markdown(table_html, unsafe_allow_html=True)
+        checkout_links = get_checkout_links()
+        table_slot = st.empty()
+        buy_col, buy_btn_col = st.columns([3, 1], vertical_alignment="bottom")
+        view_rows, page_rows, page, pages = basket_view()
+        page_df = st.session_state.basket.to_frame(page_rows)
+        buy_idx = buy_col.selectbox(
+            "Buy an item", list(page_df.index),
+            format_func=lambda i: f'{page_df.at[i, "Item"]} ({page_df.at[i, "Variant"]}) × {int(page_df.at[i, "Quantity"])}',
+            key="buy_select"
+        )
+        if buy_btn_col.button("Buy Now", key="btn_buy") and buy_idx is not None:
+            r = page_df.loc[buy_idx]
+            if not checkout_links.create(r["Item"], r["Variant"], int(r["Quantity"]), r["Unit Price"], ""):
+                st.error("Could not start checkout. Please try again.")
+
+        summary = [("Basket total", total_save, total_money)]
+        if len(view_rows) < len(st.session_state.basket):
+            filtered = st.session_state.basket.subtotals(view_rows)
+            summary.insert(0, (f"Filtered ({len(view_rows):,} lines)", filtered[2], filtered[3]))
+        eco_rows = catalog.eco[st.session_state.basket.column("catalog_idx")[page_rows]]
+        buy_urls = checkout_links.peek_many(page_df["Item"], page_df["Variant"], page_df["Quantity"], page_df["Unit Price"])
+        table_html = get_eco_table().html(page_df, eco_rows, buy_urls, summary)
+        if pages > 1:
+            st.caption(f"Page {page} of {pages}")
+        table_slot.markdown(table_html, unsafe_allow_html=True)
+
+        # WHAT-IF
+        if st.toggle("Show what-if eco swaps", key="whatif_toggle"):
+            basket_key = content_hash(df, catalog.eco[st.session_state.basket.column("catalog_idx")])
+            frontier = whatif_frontier(df, basket_key)
+            best = frontier.iloc[-1]
+            st.metric("Best possible savings", f"{best['Savings']:,.1f} kg", delta=f"+{best['Savings'] - total_save:,.1f} kg")
+            if len(frontier) > 1:
+                fig_whatif = go.Figure(go.Scatter(x=frontier["Total $"], y=frontier["Savings"], mode="lines+markers", line={"color": "#51CF66"}))
+                fig_whatif.update_layout(height=260, margin=dict(l=20, r=20, t=30, b=20), xaxis_title="Total $", yaxis_title="CO₂ Saved (kg)")
+                st.plotly_chart(fig_whatif, use_container_width=True)
+            swaps = df[["Item", "Variant"]].assign(**{"Best Variant": list(best["Choices"])})
+            swaps = swaps[swaps["Variant"] != swaps["Best Variant"]]
+            if swaps.empty:
+                st.success("You already picked the greenest variant of every item!")
+            else:
+                paged_dataframe(swaps, "whatif_swaps_page")
+
+            budget = st.number_input("Your budget ($)", min_value=0.0, value=float(total_money), step=10.0, key="whatif_budget")
+            pick = whatif_recommend(df, basket_key, budget)
+            if pick is None:
+                st.warning("Even the cheapest variants go over this budget.")
+            else:
+                st.metric("Greenest basket in budget", f"{pick['savings']:,.1f} kg", delta=f"${pick['total_usd']:,.2f} total", delta_color="off")
+                paged_dataframe(pick["lines"][["Item", "Quantity", "Variant", "Recommended"]], "whatif_pick_page")
 
         # LEADERBOARD
         st.markdown("## Leaderboard")
         user_name = st.text_input("Your Name/Email to Join", placeholder="Ana or ana@example.com", key="leaderboard_name")
 
+        if "leader_cursors" not in st.session_state:
+            st.session_state.leader_cursors = [None]
+        leader_page = len(st.session_state.leader_cursors) - 1
+        next_cursor = None
+        my_rank = None
         if supabase:
             try:
-                response = supabase.table("leaderboard").select("*").order("co2_saved", desc=True).limit(10).execute()
-                leaders = response.data
+                if leader_page == 0:
+                    leaders = get_leaderboard_cache().get()
+                    if len(leaders) == LEADERBOARD_PAGE:
+                        next_cursor = (leaders[-1]["co2_saved"], leaders[-1]["user_name"])
+                else:
+                    leaders, next_cursor = get_leaderboard_repo().page(LEADERBOARD_PAGE, after=st.session_state.leader_cursors[-1])
+                if user_name:
+                    my_rank = cached_rank(user_name)
             except:
                 leaders = []
                 st.warning("Loading leaderboard...")
@@ -395,23 +533,22 @@ with col_right:
 
         if user_name and total_save > 0 and st.button("Claim Your Rank!", type="primary", key="claim_rank"):
             if supabase:
-                try:
-                    supabase.table("leaderboard").upsert({
-                        "user_name": user_name,
-                        "co2_saved": int(total_save),
-                        "trees_planted": int(trees_saved)
-                    }, on_conflict="user_name").execute()
-                    st.success("Rank claimed!")
-                    st.balloons()
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Save failed: {e}")
+                get_leaderboard_writer().claim(user_name, int(total_save), int(trees_saved))
+                st.success("Rank claimed!")
+                st.balloons()
             else:
                 st.warning("Supabase not connected.")
 
+        if supabase and leader_page == 0:
+            leaders = get_leaderboard_writer().overlay(leaders, LEADERBOARD_PAGE)
+
+        if my_rank:
+            st.markdown(f"**Your rank: #{my_rank}**")
+
         if leaders:
             leaders_df = pd.DataFrame(leaders)
-            leaders_df["rank"] = range(1, len(leaders_df) + 1)
+            offset = leader_page * LEADERBOARD_PAGE
+            leaders_df["rank"] = range(offset + 1, offset + len(leaders_df) + 1)
             st.dataframe(
                 leaders_df[["rank", "user_name", "co2_saved", "trees_planted"]].rename(columns={"user_name": "name", "trees_planted": "trees"}),
                 use_container_width=True,
@@ -422,6 +559,13 @@ with col_right:
                 },
                 hide_index=True
             )
+            prev_col, next_col = st.columns(2)
+            if leader_page > 0 and prev_col.button("Previous", key="leader_prev"):
+                st.session_state.leader_cursors.pop()
+                st.rerun()
+            if next_cursor is not None and next_col.button("Next", key="leader_next"):
+                st.session_state.leader_cursors.append(next_cursor)
+                st.rerun()
         else:
             st.info("Be the first!")
 
@@ -448,7 +592,7 @@ with col_right:
 
             if (trees > 0 or offset_tco2 > 0) and st.button("PLANT & OFFSET", type="primary", key="btn_plant"):
                 desc = f"{trees} Trees + {offset_tco2}t via {api_choice}"
-                url = create_stripe_session(int(cost * 100), desc, {"trees": trees, "offset": offset_tco2, "api": api_choice})
+                url = create_stripe_session(int(cost * 100), desc, {"trees": trees, "offset": offset_tco2, "api": api_choice, "email": email})
                 if url:
                     st.markdown(f"[Pay Securely with Stripe]({url})")
 
@@ -473,21 +617,33 @@ with col_right:
 
         # PAYMENT SUCCESS
         session_id = st.query_params.get("session_id")
-        if session_id and verify_stripe_session(session_id):
+        paid = paid_session(session_id) if session_id else None
+        if paid:
             st.success("Payment successful!")
-            if "Waldonia" in api_choice:
-                impact = waldonia_plant_trees(trees, "Via EcoGigHub", {"email": email})
-                api_name = "Waldonia"
-            else:
-                tonnes = trees / 333 if trees > 0 else offset_tco2
-                action = "trees" if trees > 0 else "offset"
-                impact = ecologi_offset(tonnes, action)
-                api_name = "Ecologi"
-            if impact:
-                st.session_state.impacts.append({"id": impact.get("order_id") or impact.get("transaction_id", "N/A"), "trees": trees, "api": api_name, "date": datetime.now().isoformat()})
-                st.balloons()
-                st.markdown(generate_pdf_cert(trees, total_save, api_name), unsafe_allow_html=True)
-                st.rerun()
+        # item purchases from the eco-choices table carry no provider metadata
+        if paid and "api" in paid["metadata"]:
+            # fulfill what the session was paid for, not what the widgets show now
+            order = paid["metadata"]
+            paid_trees = int(float(order.get("trees") or 0))
+            record = get_ledger().get(session_id)
+            job = get_job_queue().get(session_id)
+            if record is None or record["status"] == PENDING:
+                if job and job["status"] == JOB_FAILED:
+                    st.error("We could not place your order with the provider. Please contact support with your payment reference.")
+                else:
+                    enqueue_fulfillment(get_job_queue(), session_id, order["api"], order.get("trees", 0),
+                                        order.get("offset", 0), paid["email"])
+                    await_fulfillment(session_id)
+            elif record["status"] == DONE:
+                impact = record["result"]
+                if session_id not in st.session_state.fulfilled:
+                    st.session_state.fulfilled.add(session_id)
+                    st.session_state.impacts.append({"id": impact.get("order_id") or impact.get("transaction_id", "N/A"), "trees": paid_trees, "api": record["provider"], "date": datetime.now().isoformat()})
+                    st.balloons()
+                cert = generate_pdf_cert(paid_trees, total_save, record["provider"])
+                download_artifact("Download PDF Certificate", cert, "certificate.pdf", "application/pdf", key=f"cert_{session_id}")
+            elif record["status"] == FAILED:
+                st.error("We could not place your order with the provider. Please contact support with your payment reference.")
 
         if st.session_state.impacts:
             st.markdown("### Your Impact History")
@@ -0,0 +1,51 @@
+"""Add throughput: pd.concat per add (old add_item) vs ColumnarBasket.
+
+    python benchmarks/bench_basket.py [rows]
+"""
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ecogighub.basket import REQUIRED_COLS, ColumnarBasket  # noqa: E402
+from ecogighub.catalog import load_catalog  # noqa: E402
+
+
+def concat_adds(catalog, rows):
+    basket = pd.DataFrame(columns=REQUIRED_COLS)
+    for i in range(rows):
+        r = i % len(catalog)
+        reg, eco, price = float(catalog.co2_regular[r]), float(catalog.co2[r]), float(catalog.price[r])
+        new_row = pd.DataFrame([{
+            "Category": catalog.category[r], "Item": catalog.item[r], "Variant": catalog.variant[r], "Quantity": 1,
+            "Unit CO₂ Regular": reg, "Unit CO₂ Eco": eco, "Unit Price": price,
+            "CO₂ Regular": round(reg, 3), "CO₂ Eco": round(eco, 3),
+            "Savings": round(reg - eco, 3), "Total $": round(price, 2)
+        }])
+        basket = pd.concat([basket, new_row], ignore_index=True)
+    return basket
+
+
+def columnar_adds(catalog, rows):
+    basket = ColumnarBasket(catalog)
+    for i in range(rows):
+        basket.add(i % len(catalog), 1)
+    return basket.to_frame()
+
+
+def bench(fn, catalog, rows):
+    start = time.perf_counter()
+    frame = fn(catalog, rows)
+    elapsed = time.perf_counter() - start
+    assert len(frame) == rows
+    return elapsed
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    catalog = load_catalog()
+    for name, fn in [("pd.concat per add", concat_adds), ("ColumnarBasket", columnar_adds)]:
+        elapsed = bench(fn, catalog, rows)
+        print(f"{name:<18} {rows:>7} rows  {elapsed:8.3f} s  {rows / elapsed:>12,.0f} adds/s")
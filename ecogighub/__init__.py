@@ -0,0 +1 @@
+"""EcoGigHub core: catalog, basket math and provider plumbing shared by the Streamlit app."""
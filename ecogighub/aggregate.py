@@ -0,0 +1,36 @@
+"""Running basket totals maintained incrementally as lines change."""
+import numpy as np
+
+
+class RunningTotals:
+    """The four basket sums (CO₂ regular, CO₂ eco, savings, dollars), updated in O(1) per line."""
+
+    __slots__ = ("co2_regular", "co2_eco", "savings", "dollars")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.co2_regular = 0.0
+        self.co2_eco = 0.0
+        self.savings = 0.0
+        self.dollars = 0.0
+
+    def add(self, co2_regular, co2_eco, savings, dollars, sign=1.0):
+        self.co2_regular += sign * co2_regular
+        self.co2_eco += sign * co2_eco
+        self.savings += sign * savings
+        self.dollars += sign * dollars
+
+    def add_many(self, co2_regular, co2_eco, savings, dollars, sign=1.0):
+        self.add(np.sum(co2_regular), np.sum(co2_eco), np.sum(savings), np.sum(dollars), sign)
+
+    def as_tuple(self):
+        """Totals rounded to two decimals the way the dashboard shows them."""
+        # "+ 0.0" turns a -0.0 left over from add/remove float drift into 0.0
+        return (
+            round(float(self.co2_regular), 2) + 0.0,
+            round(float(self.co2_eco), 2) + 0.0,
+            round(float(self.savings), 2) + 0.0,
+            round(float(self.dollars), 2) + 0.0,
+        )
@@ -0,0 +1,190 @@
+"""Headless JSON API over the same catalog and calculations as the Streamlit app.
+
+Plain ASGI with no framework dependency; serve it with any ASGI server::
+
+    uvicorn ecogighub.api:app --workers 4
+
+Endpoints:
+
+- ``POST /v1/footprint`` ``{"items": [{"item", "variant", "quantity", "category"?}], "shares"?}``
+- ``POST /v1/recommend`` ``{"items": [{"item", "quantity", "category"?}], "budget"}``
+- ``POST /v1/badges`` ``{"co2_saved", "trees_planted"?, "shares"?}``
+- ``GET  /v1/trees?co2_kg=<kg>``
+- ``GET  /v1/catalog``
+- ``GET  /healthz``
+"""
+import asyncio
+import functools
+import json
+import math
+from urllib.parse import parse_qs
+
+from .catalog import DEFAULT_PATH, load_catalog
+from .core import TREE_CO2_YEAR, check_badges, footprint, tree_equivalents
+from .recommend import recommend, required_items
+from .settings import setting
+
+MAX_BODY = 1 << 20  # 1 MiB
+MAX_ITEMS = 5000
+MAX_RECOMMEND_ITEMS = 200  # the knapsack search grows much faster than footprint totals
+MAX_QUANTITY = 10 ** 9
+
+# basket columns -> JSON field names
+LINE_FIELDS = {
+    "Category": "category", "Item": "item", "Variant": "variant", "Quantity": "quantity",
+    "Unit CO₂ Regular": "unit_co2_regular", "Unit CO₂ Eco": "unit_co2_eco", "Unit Price": "unit_price",
+    "CO₂ Regular": "co2_regular", "CO₂ Eco": "co2_eco", "Savings": "savings", "Total $": "total_usd",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@functools.lru_cache(maxsize=None)
+def _catalog_path():
+    # same source as the app's catalog_path secret, read once per process
+    return setting("catalog_path", DEFAULT_PATH)
+
+
+def _catalog():
+    return load_catalog(_catalog_path())
+
+
+def _number(value, name):
+    try:
+        number = float(value)
+    except (TypeError, ValueError, OverflowError):
+        raise HTTPError(400, f"'{name}' must be a number")
+    if not math.isfinite(number):
+        raise HTTPError(400, f"'{name}' must be a finite number")
+    return number
+
+
+def _items(body, fields=("item", "variant"), limit=MAX_ITEMS):
+    """Validated ``items`` (at most ``limit``) with string ``fields``/``category`` and integer quantities."""
+    items = body.get("items")
+    if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+        raise HTTPError(400, "'items' must be a list of objects")
+    if len(items) > limit:
+        raise HTTPError(413, f"At most {limit} items per request")
+    lines = []
+    for item in items:
+        for field in fields + ("category",):
+            if field in item and not isinstance(item[field], str):
+                raise HTTPError(400, f"Each item's '{field}' must be a string")
+        quantity = _number(item.get("quantity", 1) or 0, "quantity")
+        if abs(quantity) > MAX_QUANTITY:
+            raise HTTPError(400, f"Each item's 'quantity' must be at most {MAX_QUANTITY}")
+        lines.append({**item, "quantity": int(quantity)})
+    return lines
+
+
+def post_footprint(body, query):
+    items = _items(body)
+    result = footprint(_catalog(), items, int(_number(body.get("shares", 0), "shares")))
+    result["lines"] = [{LINE_FIELDS[k]: v for k, v in line.items()} for line in result["lines"]]
+    return result
+
+
+def post_recommend(body, query):
+    items = _items(body, fields=("item",), limit=MAX_RECOMMEND_ITEMS)
+    budget = _number(body.get("budget"), "budget")
+    catalog = _catalog()
+    frame, unknown = required_items(items, catalog)
+    pick = recommend(frame, catalog, budget)
+    if pick is None:
+        raise HTTPError(422, "No combination of variants fits within 'budget'")
+    lines = pick["lines"][["Category", "Item", "Recommended", "Quantity"]]
+    lines.columns = ["category", "item", "variant", "quantity"]
+    return {"budget": budget, "total_usd": pick["total_usd"], "savings": pick["savings"],
+            "lines": lines.to_dict("records"), "unknown": unknown}
+
+
+def post_badges(body, query):
+    co2 = _number(body.get("co2_saved"), "co2_saved")
+    trees = body.get("trees_planted")
+    trees = int(tree_equivalents(co2)) if trees is None else int(_number(trees, "trees_planted"))
+    shares = int(_number(body.get("shares", 0), "shares"))
+    return {"badges": check_badges(co2, trees, shares)}
+
+
+def get_trees(body, query):
+    co2 = _number((query.get("co2_kg") or [None])[0], "co2_kg")
+    return {"co2_kg": co2, "trees": round(tree_equivalents(co2), 2), "kg_per_tree_year": TREE_CO2_YEAR}
+
+
+def get_catalog(body, query):
+    catalog = _catalog()
+    return {cat: {item: catalog.variants(cat, item) for item in catalog.items(cat)} for cat in catalog.categories()}
+
+
+def get_health(body, query):
+    return {"ok": True}
+
+
+ROUTES = {
+    ("POST", "/v1/footprint"): post_footprint,
+    ("POST", "/v1/recommend"): post_recommend,
+    ("POST", "/v1/badges"): post_badges,
+    ("GET", "/v1/trees"): get_trees,
+    ("GET", "/v1/catalog"): get_catalog,
+    ("GET", "/healthz"): get_health,
+}
+
+
+async def _read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY:
+            raise HTTPError(413, "Request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send_json(send, status, payload):
+    data = json.dumps(payload, default=str).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())]})
+    await send({"type": "http.response.body", "body": data})
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                _catalog()  # load once before the first request
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    handler = ROUTES.get((scope["method"], scope["path"]))
+    try:
+        if handler is None:
+            if any(path == scope["path"] for _, path in ROUTES):
+                raise HTTPError(405, "Method not allowed")
+            raise HTTPError(404, "Not found")
+        body = {}
+        if scope["method"] == "POST":
+            raw = await _read_body(receive)
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                raise HTTPError(400, "Body must be JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(400, "Body must be a JSON object")
+        query = parse_qs(scope.get("query_string", b"").decode())
+        # handlers are CPU-bound; keep the event loop free for other requests
+        await _send_json(send, 200, await asyncio.to_thread(handler, body, query))
+    except HTTPError as e:
+        await _send_json(send, e.status, {"error": e.message})
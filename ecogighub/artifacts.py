@@ -0,0 +1,38 @@
+"""Content-addressed on-disk store for generated downloads (certificates, exports)."""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+
+class ArtifactStore:
+    """Files named by the SHA-256 of their bytes, so identical artifacts are stored once.
+
+    The app hands the file to ``st.download_button``, which serves it from
+    Streamlit's media endpoint instead of inlining a base64 data URI in the page.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, name):
+        return self.root / name[:2] / name
+
+    def put(self, data, suffix=""):
+        """Store ``data`` (bytes) and return its name (``<sha256><suffix>``)."""
+        name = hashlib.sha256(data).hexdigest() + suffix
+        target = self.path(name)
+        if not target.exists():
+            target.parent.mkdir(exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)  # atomic: readers never see a partial file
+        return name
+
+    def open(self, name):
+        return open(self.path(name), "rb")
+
+    def __contains__(self, name):
+        return self.path(name).exists()
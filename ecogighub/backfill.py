@@ -0,0 +1,91 @@
+"""Backfill earned badges for every leaderboard user into the ``user_badges`` table.
+
+Streams the leaderboard a keyset page at a time, evaluates the badges of a
+whole page with one ``searchsorted`` per metric, and upserts the earned
+``(user_name, badge)`` pairs, so memory stays bounded by the page size::
+
+    python -m ecogighub.backfill --page-size 5000 --badge "Tree Hugger"
+
+``user_badges`` needs a unique constraint on ``(user_name, badge)``.
+"""
+import argparse
+import logging
+
+import numpy as np
+
+from .badges import BadgeEngine
+from .core import BADGES
+from .leaderboard import LeaderboardRepository
+from .settings import load_secrets, setting
+
+log = logging.getLogger(__name__)
+
+# leaderboard columns the badge metrics are read from
+METRIC_COLUMNS = ("co2_saved", "trees_planted")
+
+
+def earned_pairs(engine, rows, columns=METRIC_COLUMNS):
+    """``(user_indexes, badges)`` for every badge the leaderboard ``rows`` have earned."""
+    users, badges = [], []
+    for metric in columns:
+        ladder = engine.ladder(metric)
+        if not ladder:
+            continue
+        values = np.array([r.get(metric) for r in rows], dtype=float)
+        counts = engine.counts(metric, np.nan_to_num(values, nan=-np.inf))
+        user, rung = np.nonzero(counts[:, None] > np.arange(len(ladder)))
+        users.append(user)
+        badges.extend(ladder[i]["name"] for i in rung)
+    return (np.concatenate(users) if users else np.empty(0, dtype=np.intp)), badges
+
+
+def backfill(repository, write, engine=None, page_size=1000, columns=METRIC_COLUMNS):
+    """Evaluate ``engine`` (all ``BADGES`` by default) for every leaderboard user.
+
+    ``write`` receives each page's ``{"user_name", "badge"}`` rows. Returns
+    ``{"users", "badges"}`` counts.
+    """
+    engine = engine or BadgeEngine(BADGES)
+    users = written = 0
+    cursor = None
+    while True:
+        rows, cursor = repository.page(page_size, after=cursor)
+        user_idx, badges = earned_pairs(engine, rows, columns)
+        if badges:
+            write([{"user_name": rows[i]["user_name"], "badge": b} for i, b in zip(user_idx.tolist(), badges)])
+        users += len(rows)
+        written += len(badges)
+        log.info("backfilled %d users, %d badges", users, written)
+        if cursor is None:
+            return {"users": users, "badges": written}
+
+
+def badge_writer(client, table="user_badges"):
+    """``write`` callable for :func:`backfill` that upserts into Supabase without echoing rows back."""
+    def write(rows):
+        client.table(table).upsert(rows, on_conflict="user_name,badge", ignore_duplicates=True,
+                                   returning="minimal").execute()
+    return write
+
+
+def main(argv=None):
+    from supabase import create_client
+
+    secrets = load_secrets()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--badge", action="append", help="only backfill this badge (repeatable)")
+    parser.add_argument("--table", default="user_badges")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    badges = [b for b in BADGES if not args.badge or b["name"] in args.badge]
+    if not badges:
+        parser.error(f"no badge named {', '.join(args.badge)}")
+    client = create_client(setting("SUPABASE_URL", secrets=secrets), setting("SUPABASE_KEY", secrets=secrets))
+    result = backfill(LeaderboardRepository(client), badge_writer(client, args.table),
+                      BadgeEngine(badges), args.page_size)
+    print(f"{result['users']:,} users, {result['badges']:,} badges")
+
+
+if __name__ == "__main__":
+    main()
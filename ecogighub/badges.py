@@ -0,0 +1,61 @@
+"""Declarative badge engine: each badge names a metric and a threshold."""
+import numpy as np
+
+
+class BadgeEngine:
+    """Evaluates badges with one binary search per metric.
+
+    ``badges`` are mappings with at least ``metric`` and ``threshold``; a badge
+    is earned when the metric is ``>=`` its threshold. Badges are grouped by
+    metric into sorted threshold arrays, so a user is evaluated in
+    O(metrics · log badges) however many badges there are.
+    """
+
+    def __init__(self, badges):
+        self.badges = list(badges)
+        groups = {}
+        for i, badge in enumerate(self.badges):
+            if "metric" not in badge or "threshold" not in badge:
+                raise ValueError(f"Badge {badge.get('name', i)!r} needs a 'metric' and a 'threshold'")
+            groups.setdefault(badge["metric"], []).append(i)
+        self.thresholds, self.order = {}, {}
+        for metric, idx in groups.items():
+            idx = np.array(idx)
+            thresholds = np.array([self.badges[i]["threshold"] for i in idx], dtype=float)
+            sort = np.argsort(thresholds, kind="stable")
+            self.thresholds[metric] = thresholds[sort]
+            self.order[metric] = idx[sort]
+
+    @property
+    def metrics(self):
+        return list(self.thresholds)
+
+    def earned_indexes(self, metrics):
+        """Indexes into ``badges`` earned for a ``{metric: value}`` mapping, in declaration order.
+
+        Metrics missing from ``metrics`` earn nothing.
+        """
+        earned = []
+        for metric, thresholds in self.thresholds.items():
+            value = metrics.get(metric)
+            if value is not None:
+                earned.extend(self.order[metric][:np.searchsorted(thresholds, value, side="right")])
+        return sorted(earned)
+
+    def evaluate(self, metrics):
+        """Badges earned for a ``{metric: value}`` mapping."""
+        return [self.badges[i] for i in self.earned_indexes(metrics)]
+
+    def counts(self, metric, values):
+        """Vectorized: how many of ``metric``'s badges each of ``values`` has earned.
+
+        The earned badges for a count ``k`` are ``ladder(metric)[:k]``.
+        """
+        thresholds = self.thresholds.get(metric)
+        if thresholds is None:
+            return np.zeros(len(values), dtype=np.intp)
+        return np.searchsorted(thresholds, np.asarray(values, dtype=float), side="right")
+
+    def ladder(self, metric):
+        """``metric``'s badges in ascending threshold order."""
+        return [self.badges[i] for i in self.order.get(metric, ())]
@@ -0,0 +1,261 @@
+"""Append-only columnar basket backed by NumPy arrays."""
+import numpy as np
+import pandas as pd
+
+from .aggregate import RunningTotals
+
+REQUIRED_COLS = [
+    "Category", "Item", "Variant", "Quantity",
+    "Unit CO₂ Regular", "Unit CO₂ Eco", "Unit Price",
+    "CO₂ Regular", "CO₂ Eco", "Savings", "Total $"
+]
+
+_INPUTS = {
+    "quantity": np.int64,
+    "unit_reg": np.float64,
+    "unit_eco": np.float64,
+    "price": np.float64,
+    "catalog_idx": np.int64,
+}
+# Per-line results, re-derived only for dirty lines.
+_DERIVED = ("co2_reg", "co2_eco", "savings", "dollars")
+SORT_KEYS = ("added", "savings", "price", "category")
+
+
+def derive(qty, unit_reg, unit_eco, price):
+    """Line results exactly as the dashboard rounds them: (CO₂ regular, CO₂ eco, savings, $)."""
+    co2_reg = np.round(qty * unit_reg, 3)
+    co2_eco = np.round(qty * unit_eco, 3)
+    return co2_reg, co2_eco, np.round(co2_reg - co2_eco, 3), np.round(qty * price, 2)
+
+
+def paginate(rows, page, size):
+    """``(rows on the page, page, pages)`` for a 1-based ``page``, clamped to the valid range."""
+    pages = max(1, -(-len(rows) // size))
+    page = min(max(1, int(page)), pages)
+    return rows[(page - 1) * size:page * size], page, pages
+
+
+class ColumnarBasket:
+    """Basket lines stored column-wise in preallocated arrays.
+
+    Adding a line writes into spare capacity and the arrays double when full, so
+    ``n`` adds cost amortized O(n) instead of the O(n²) of ``pd.concat`` per add.
+    Labels (category, item, variant) are resolved from the catalog by index; a
+    ``REQUIRED_COLS`` DataFrame is only built by :meth:`to_frame`.
+
+    Totals are kept in a :class:`RunningTotals`: edits only mark lines dirty, and
+    :meth:`totals` re-derives just those lines, so no call rescans the basket.
+    """
+
+    def __init__(self, catalog, capacity=16):
+        self.catalog = catalog
+        self._n = 0
+        cap = max(1, capacity)
+        self._cols = {name: np.zeros(cap, dtype=dt) for name, dt in _INPUTS.items()}
+        self._cols.update({name: np.zeros(cap, dtype=np.float64) for name in _DERIVED})
+        self._dirty = set()
+        self._totals = RunningTotals()
+        self._frame = None
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def empty(self):
+        return self._n == 0
+
+    def column(self, name):
+        """Read-only view of the live part of a column."""
+        self._refresh()
+        view = self._cols[name][:self._n]
+        view.flags.writeable = False
+        return view
+
+    def _reserve(self, extra):
+        need = self._n + extra
+        cap = len(self._cols["quantity"])
+        if need <= cap:
+            return
+        while cap < need:
+            cap *= 2
+        for name, arr in self._cols.items():
+            grown = np.zeros(cap, dtype=arr.dtype)
+            grown[:self._n] = arr[:self._n]
+            self._cols[name] = grown
+
+    def _derive_into(self, s):
+        """Derive lines ``s`` (a slice or index array) and return the new values."""
+        c = self._cols
+        values = derive(c["quantity"][s], c["unit_reg"][s], c["unit_eco"][s], c["price"][s])
+        for name, v in zip(_DERIVED, values):
+            c[name][s] = v
+        return values
+
+    def _refresh(self):
+        if not self._dirty:
+            return
+        rows = np.fromiter(self._dirty, dtype=np.int64, count=len(self._dirty))
+        c = self._cols
+        self._totals.add_many(*(c[name][rows] for name in _DERIVED), sign=-1.0)
+        self._totals.add_many(*self._derive_into(rows))
+        self._dirty.clear()
+
+    def add(self, catalog_idx, qty):
+        """Append one line for catalog row ``catalog_idx``; returns its position."""
+        if not 0 <= catalog_idx < len(self.catalog):
+            raise IndexError(f"Catalog row {catalog_idx} is out of range")
+        self._reserve(1)
+        i = self._n
+        c = self._cols
+        c["catalog_idx"][i] = catalog_idx
+        c["quantity"][i] = int(qty)
+        c["unit_reg"][i] = self.catalog.co2_regular[catalog_idx]
+        c["unit_eco"][i] = self.catalog.co2[catalog_idx]
+        c["price"][i] = self.catalog.price[catalog_idx]
+        # scalar fast path: Python round() is much cheaper than np.round on 0-d values
+        q, reg, eco = int(qty), float(c["unit_reg"][i]), float(c["unit_eco"][i])
+        co2_reg, co2_eco = round(q * reg, 3), round(q * eco, 3)
+        values = (co2_reg, co2_eco, round(co2_reg - co2_eco, 3), round(q * float(c["price"][i]), 2))
+        for name, v in zip(_DERIVED, values):
+            c[name][i] = v
+        self._totals.add(*values)
+        self._n += 1
+        self._frame = None
+        return i
+
+    def extend(self, catalog_idx, qty):
+        """Append many lines at once from parallel arrays of catalog rows and quantities."""
+        catalog_idx = np.asarray(catalog_idx, dtype=np.int64)
+        bad = (catalog_idx < 0) | (catalog_idx >= len(self.catalog))
+        if bad.any():
+            raise IndexError(f"Catalog row {catalog_idx[bad][0]} is out of range")
+        k = len(catalog_idx)
+        self._reserve(k)
+        s = slice(self._n, self._n + k)
+        c = self._cols
+        c["catalog_idx"][s] = catalog_idx
+        c["quantity"][s] = np.asarray(qty, dtype=np.int64)
+        c["unit_reg"][s] = self.catalog.co2_regular[catalog_idx]
+        c["unit_eco"][s] = self.catalog.co2[catalog_idx]
+        c["price"][s] = self.catalog.price[catalog_idx]
+        self._totals.add_many(*self._derive_into(s))
+        self._n += k
+        self._frame = None
+
+    def set_quantity(self, i, qty):
+        if self._cols["quantity"][i] == int(qty):
+            return
+        self._cols["quantity"][i] = int(qty)
+        self._dirty.add(int(i))
+        self._frame = None
+
+    def set_quantities(self, qty, rows=None):
+        """Overwrite the quantities of ``rows`` (default: every line), e.g. from the basket editor.
+
+        Only lines whose quantity actually changed go dirty.
+        """
+        qty = np.asarray(qty, dtype=np.int64)
+        rows = np.arange(self._n) if rows is None else np.asarray(rows, dtype=np.int64)
+        current = self._cols["quantity"]
+        diff = qty != current[rows]
+        if not diff.any():
+            return
+        changed = rows[diff]
+        current[changed] = qty[diff]
+        self._dirty.update(changed.tolist())
+        self._frame = None
+
+    def remove(self, i):
+        self.set_quantity(i, 0)
+        self.compact()
+
+    def compact(self):
+        """Drop lines whose quantity is zero or negative, keeping order."""
+        self._refresh()
+        keep = self._cols["quantity"][:self._n] > 0
+        kept = int(keep.sum())
+        if kept == self._n:
+            return
+        c = self._cols
+        self._totals.add_many(*(c[name][:self._n][~keep] for name in _DERIVED), sign=-1.0)
+        for arr in c.values():
+            arr[:kept] = arr[:self._n][keep]
+        self._n = kept
+        if not kept:
+            self._totals.reset()
+        self._frame = None
+
+    def clear(self):
+        self._n = 0
+        self._dirty.clear()
+        self._totals.reset()
+        self._frame = None
+
+    def totals(self):
+        """(CO₂ regular, CO₂ eco, savings, dollars), rounded to two decimals."""
+        self._refresh()
+        return self._totals.as_tuple()
+
+    def subtotals(self, rows):
+        """Totals of just ``rows`` (e.g. a filtered view), in the form of :meth:`totals`."""
+        self._refresh()
+        totals = RunningTotals()
+        totals.add_many(*(self._cols[name][:self._n][rows] for name in _DERIVED))
+        return totals.as_tuple()
+
+    def select(self, category=None, min_savings=None, max_price=None, sort="added", descending=False):
+        """Positions of the lines passing the filters, ordered by one of ``SORT_KEYS``.
+
+        ``max_price`` applies to the line total. Ties keep basket order, so
+        paging through the result is stable between reruns.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key {sort!r} (use {', '.join(SORT_KEYS)})")
+        self._refresh()
+        c = {name: arr[:self._n] for name, arr in self._cols.items()}
+        keep = np.ones(self._n, dtype=bool)
+        if category is not None:
+            keep &= self.catalog.category[c["catalog_idx"]] == category
+        if min_savings is not None:
+            keep &= c["savings"] >= min_savings
+        if max_price is not None:
+            keep &= c["dollars"] <= max_price
+        rows = np.flatnonzero(keep)
+        if sort == "added":
+            return rows[::-1] if descending else rows
+        if sort == "category":
+            key = np.unique(self.catalog.category[c["catalog_idx"][rows]], return_inverse=True)[1]
+        else:
+            key = c["savings" if sort == "savings" else "dollars"][rows]
+        return rows[np.argsort(-key if descending else key, kind="stable")]
+
+    def to_frame(self, rows=None):
+        """Materialize the basket as a ``REQUIRED_COLS`` DataFrame (cached until the next change).
+
+        With ``rows``, only those lines are built, indexed by their basket position.
+        """
+        if rows is not None:
+            self._refresh()
+            return self._build_frame(np.asarray(rows, dtype=np.int64))
+        if self._frame is None:
+            self._refresh()
+            self._frame = self._build_frame(slice(0, self._n))
+        return self._frame
+
+    def _build_frame(self, rows):
+        c = {name: arr[rows] for name, arr in self._cols.items()}
+        idx = c["catalog_idx"]
+        return pd.DataFrame({
+            "Category": self.catalog.category[idx],
+            "Item": self.catalog.item[idx],
+            "Variant": self.catalog.variant[idx],
+            "Quantity": c["quantity"].copy(),
+            "Unit CO₂ Regular": c["unit_reg"].copy(),
+            "Unit CO₂ Eco": c["unit_eco"].copy(),
+            "Unit Price": c["price"].copy(),
+            "CO₂ Regular": c["co2_reg"].copy(),
+            "CO₂ Eco": c["co2_eco"].copy(),
+            "Savings": c["savings"].copy(),
+            "Total $": c["dollars"].copy(),
+        }, columns=REQUIRED_COLS, index=None if isinstance(rows, slice) else rows)
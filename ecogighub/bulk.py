@@ -0,0 +1,210 @@
+"""Bulk footprint calculation for uploaded purchase histories.
+
+Files too large for memory can be folded chunk by chunk::
+
+    python -m ecogighub.bulk expenses.csv --chunksize 500000
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .aggregate import RunningTotals
+from .basket import REQUIRED_COLS, derive
+from .catalog import classify_eco
+
+PURCHASE_COLS = ["item", "variant", "quantity"]
+
+READERS = {
+    ".csv": pd.read_csv,
+    ".parquet": pd.read_parquet,
+}
+
+
+def read_purchases(source, name=None):
+    """Load purchase lines from a path or file object; the file type comes from ``name`` or the path."""
+    suffix = Path(name or getattr(source, "name", None) or str(source)).suffix.lower()
+    reader = READERS.get(suffix)
+    if reader is None:
+        raise ValueError(f"Unsupported purchase file '{suffix}' (use {', '.join(READERS)})")
+    return reader(source)
+
+
+def normalize_purchases(lines):
+    """Lower-case/strip column names, check required columns and coerce quantities to ints."""
+    lines = lines.rename(columns=lambda c: str(c).strip().lower())
+    missing = set(PURCHASE_COLS) - set(lines.columns)
+    if missing:
+        raise ValueError(f"Purchase file is missing columns: {sorted(missing)}")
+    keys = ["category"] + PURCHASE_COLS if "category" in lines.columns else PURCHASE_COLS
+    lines = lines[keys].copy()
+    for col in keys[:-1]:
+        lines[col] = lines[col].astype(str).str.strip()
+    lines["quantity"] = pd.to_numeric(lines["quantity"], errors="coerce").fillna(0).astype(np.int64)
+    return lines
+
+
+def match_catalog(lines, catalog):
+    """Catalog row for every purchase line (``-1`` where there is no match), via one merge."""
+    table = catalog.to_frame()
+    on = ["category", "item", "variant"] if "category" in lines.columns else ["item", "variant"]
+    # without a category column an item/variant pair resolves to its first catalog entry
+    table = table[on + ["row"]].drop_duplicates(on, keep="first")
+    matched = lines[on].merge(table, on=on, how="left", sort=False)
+    return matched["row"].fillna(-1).to_numpy(dtype=np.int64)
+
+
+def compute_lines(rows, qty, catalog):
+    """``REQUIRED_COLS`` frame for matched catalog ``rows`` and quantities, fully vectorized."""
+    unit_reg, unit_eco, price = catalog.co2_regular[rows], catalog.co2[rows], catalog.price[rows]
+    co2_reg, co2_eco, savings, dollars = derive(qty, unit_reg, unit_eco, price)
+    return pd.DataFrame({
+        "Category": catalog.category[rows], "Item": catalog.item[rows], "Variant": catalog.variant[rows],
+        "Quantity": qty, "Unit CO₂ Regular": unit_reg, "Unit CO₂ Eco": unit_eco, "Unit Price": price,
+        "CO₂ Regular": co2_reg, "CO₂ Eco": co2_eco, "Savings": savings, "Total $": dollars,
+    }, columns=REQUIRED_COLS)
+
+
+def summarize(frame):
+    """Basket-style totals for a ``REQUIRED_COLS`` frame."""
+    return {
+        "co2_regular": round(float(frame["CO₂ Regular"].sum()), 2),
+        "co2_eco": round(float(frame["CO₂ Eco"].sum()), 2),
+        "savings": round(float(frame["Savings"].sum()), 2),
+        "total_usd": round(float(frame["Total $"].sum()), 2),
+    }
+
+
+def bulk_footprint(lines, catalog):
+    """Price a table of purchase lines against the catalog in one pass.
+
+    Returns ``(frame, totals, unmatched)``: per-line results in the basket's
+    ``REQUIRED_COLS`` schema plus ``Catalog Row`` (for adding the lines to a
+    basket) and ``Eco`` columns, totals as in :func:`summarize`, and the input
+    lines that are not in the catalog or have a non-positive quantity, with an
+    ``eco`` column classified from their free-text variant.
+    """
+    lines = normalize_purchases(lines)
+    rows = match_catalog(lines, catalog)
+    qty = lines["quantity"].to_numpy()
+    ok = (rows >= 0) & (qty > 0)
+    frame = compute_lines(rows[ok], qty[ok], catalog)
+    frame["Catalog Row"] = rows[ok]
+    frame["Eco"] = catalog.eco[rows[ok]]
+    unmatched = lines[~ok].assign(eco=classify_eco(lines["variant"].to_numpy()[~ok]))
+    return frame, summarize(frame), unmatched
+
+
+# -------------------------------------------------
+# STREAMING
+# -------------------------------------------------
+def _csv_chunks(source, chunksize):
+    wanted = {"category", *PURCHASE_COLS}
+    yield from pd.read_csv(source, chunksize=chunksize, usecols=lambda c: str(c).strip().lower() in wanted)
+
+
+def _parquet_chunks(source, chunksize):
+    import pyarrow.parquet as pq  # optional; pandas' own Parquet support needs it anyway
+
+    pf = pq.ParquetFile(source)
+    wanted = {"category", *PURCHASE_COLS}
+    columns = [c for c in pf.schema_arrow.names if c.strip().lower() in wanted]
+    for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+
+CHUNK_READERS = {
+    ".csv": _csv_chunks,
+    ".parquet": _parquet_chunks,
+}
+
+
+class StreamingFootprint:
+    """Folds purchase chunks into running totals with memory bounded by the catalog size.
+
+    Each chunk goes through the same match/derive steps as :func:`bulk_footprint`,
+    then its results are added to :class:`RunningTotals` and to per-catalog-entry
+    accumulators (via ``np.bincount``), from which per-category and per-item
+    breakdowns are built on demand. Nothing proportional to the input is kept.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.totals = RunningTotals()
+        self.lines = 0
+        self.unmatched = 0
+        n = len(catalog)
+        self._by_row = {name: np.zeros(n) for name in ("quantity", "co2_regular", "co2_eco", "savings", "dollars")}
+
+    def add_chunk(self, chunk):
+        lines = normalize_purchases(chunk)
+        rows = match_catalog(lines, self.catalog)
+        qty = lines["quantity"].to_numpy()
+        ok = (rows >= 0) & (qty > 0)
+        rows, qty = rows[ok], qty[ok]
+        c = self.catalog
+        values = derive(qty, c.co2_regular[rows], c.co2[rows], c.price[rows])
+        self.totals.add_many(*values)
+        n = len(c)
+        self._by_row["quantity"] += np.bincount(rows, weights=qty, minlength=n)
+        for name, v in zip(("co2_regular", "co2_eco", "savings", "dollars"), values):
+            self._by_row[name] += np.bincount(rows, weights=v, minlength=n)
+        self.lines += len(lines)
+        self.unmatched += int((~ok).sum())
+        return self
+
+    def breakdown(self, by="category"):
+        """Aggregates per ``category``, ``item`` or catalog entry (``variant``), largest savings first."""
+        keys = {"category": ["category"], "item": ["category", "item"], "variant": ["category", "item", "variant"]}[by]
+        frame = self.catalog.to_frame()[keys].assign(**self._by_row)
+        frame = frame[frame["quantity"] > 0].groupby(keys, sort=False, as_index=False).sum()
+        frame["quantity"] = frame["quantity"].astype(np.int64)
+        return frame.sort_values("savings", ascending=False, ignore_index=True)
+
+    def summary(self):
+        co2_regular, co2_eco, savings, dollars = self.totals.as_tuple()
+        return {"lines": self.lines, "unmatched": self.unmatched, "co2_regular": co2_regular,
+                "co2_eco": co2_eco, "savings": savings, "total_usd": dollars}
+
+
+def stream_footprint(source, catalog, chunksize=100_000, name=None, progress=None):
+    """Compute a file's footprint chunk by chunk; returns the :class:`StreamingFootprint`.
+
+    ``progress(lines_so_far)`` is called after every chunk when given.
+    """
+    suffix = Path(name or getattr(source, "name", None) or str(source)).suffix.lower()
+    reader = CHUNK_READERS.get(suffix)
+    if reader is None:
+        raise ValueError(f"Unsupported purchase file '{suffix}' (use {', '.join(CHUNK_READERS)})")
+    result = StreamingFootprint(catalog)
+    for chunk in reader(source, chunksize):
+        result.add_chunk(chunk)
+        if progress:
+            progress(result.lines)
+    return result
+
+
+def main(argv=None):
+    from .catalog import DEFAULT_PATH, load_catalog
+    from .settings import setting
+
+    parser = argparse.ArgumentParser(description="Footprint of a purchase file, streamed in chunks.")
+    parser.add_argument("purchases")
+    parser.add_argument("--catalog", default=setting("catalog_path", DEFAULT_PATH))
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--by", choices=["category", "item", "variant"], default="category")
+    parser.add_argument("--out", help="write the breakdown to this CSV")
+    args = parser.parse_args(argv)
+    result = stream_footprint(args.purchases, load_catalog(args.catalog), args.chunksize)
+    for key, value in result.summary().items():
+        print(f"{key:>12}: {value:,}")
+    breakdown = result.breakdown(args.by)
+    if args.out:
+        breakdown.to_csv(args.out, index=False)
+    else:
+        print(breakdown.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Small thread-safe caches shared across Streamlit sessions in one process."""
+import threading
+import time
+
+
+class TTLCache:
+    """Key/value store where every entry expires ``ttl`` seconds after it was set."""
+
+    def __init__(self, ttl, maxsize=4096, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires is not None and expires <= self._clock():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                self._evict()
+            self._data[key] = (value, expires)
+        return value
+
+    def get_or_create(self, key, factory, ttl=None):
+        """Return the cached value for ``key``; call ``factory()`` on a miss.
+
+        Falsy results (e.g. a failed Stripe call returning ``None``) are not cached.
+        """
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            if value:
+                self.set(key, value, ttl)
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _evict(self):
+        now = self._clock()
+        expired = [k for k, (_, exp) in self._data.items() if exp is not None and exp <= now]
+        for k in expired:
+            del self._data[k]
+        if len(self._data) >= self.maxsize:
+            # dicts keep insertion order: drop the oldest entry
+            del self._data[next(iter(self._data))]
@@ -0,0 +1,114 @@
+"""Emission-factor catalog: one row per (category, item, variant), loaded once per process."""
+import functools
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PATH = Path(__file__).parent / "data" / "emission_factors.csv"
+CATALOG_COLS = ["category", "item", "variant", "co2_kg", "price"]
+BASELINE_KEYS = ("regular", "standard")
+ECO_KEYS = ("eco", "bio", "vegan", "plant-based", "oat", "fair-trade", "local", "reusable", "electric", "green",
+            "low-voc", "sustainable")
+ECO_PATTERN = re.compile("|".join(map(re.escape, ECO_KEYS)), re.IGNORECASE)
+
+LOADERS = {
+    ".csv": pd.read_csv,
+    ".json": lambda path: pd.read_json(path, orient="records"),
+    ".parquet": pd.read_parquet,  # needs pyarrow or fastparquet
+}
+
+
+def register_loader(suffix, loader):
+    """Teach :func:`load_catalog` a new file type; ``loader(path)`` must return a DataFrame."""
+    LOADERS[suffix.lower()] = loader
+
+
+def classify_eco(variants):
+    """Vectorized eco/regular classification of free-text variant names with one precompiled regex."""
+    return pd.Series(variants, dtype=object).astype(str).str.contains(ECO_PATTERN).to_numpy(dtype=bool, copy=True)
+
+
+class EmissionCatalog:
+    """Array-backed emission factors with O(1) lookups by (category, item, variant).
+
+    Row order follows the source file, so variants keep the order they are listed in.
+    For every row, ``baseline[row]`` points at the item's "regular" row: the first of
+    ``regular``/``standard`` if present, otherwise the item's first variant.
+    ``eco[row]`` comes from an optional boolean ``eco`` column, falling back to
+    :func:`classify_eco` on the variant name.
+    """
+
+    def __init__(self, frame):
+        missing = set(CATALOG_COLS) - set(frame.columns)
+        if missing:
+            raise ValueError(f"Catalog is missing columns: {sorted(missing)}")
+        eco = frame["eco"].reset_index(drop=True) if "eco" in frame.columns else None
+        frame = frame[CATALOG_COLS].reset_index(drop=True)
+        self.category = frame["category"].astype(str).to_numpy(dtype=object)
+        self.item = frame["item"].astype(str).to_numpy(dtype=object)
+        self.variant = frame["variant"].astype(str).to_numpy(dtype=object)
+        self.co2 = pd.to_numeric(frame["co2_kg"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+        self.price = pd.to_numeric(frame["price"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+        self.eco = classify_eco(self.variant)
+        if eco is not None:
+            given = eco.notna().to_numpy()
+            self.eco[given] = eco[given].astype(bool).to_numpy()
+
+        self._index = {}
+        self._items = {}
+        self._variants = {}
+        for row, key in enumerate(zip(self.category, self.item, self.variant)):
+            if key in self._index:
+                raise ValueError(f"Duplicate catalog entry: {key}")
+            self._index[key] = row
+            self._items.setdefault(key[0], {}).setdefault(key[1], None)
+            self._variants.setdefault(key[:2], []).append(row)
+
+        self.baseline = np.empty(len(frame), dtype=np.int64)
+        for rows in self._variants.values():
+            names = [self.variant[r] for r in rows]
+            base = next((rows[names.index(k)] for k in BASELINE_KEYS if k in names), rows[0])
+            self.baseline[rows] = base
+        self.co2_regular = self.co2[self.baseline]
+        self._frame = None
+
+    def __len__(self):
+        return len(self.co2)
+
+    def categories(self):
+        return list(self._items)
+
+    def items(self, category):
+        return list(self._items.get(category, ()))
+
+    def variants(self, category, item):
+        return [self.variant[r] for r in self._variants.get((category, item), ())]
+
+    def variant_rows(self, category, item):
+        """Catalog rows of every variant of an item, in file order."""
+        return np.asarray(self._variants.get((category, item), ()), dtype=np.int64)
+
+    def lookup(self, category, item, variant):
+        """Row index for an entry, or ``-1`` if it is not in the catalog."""
+        return self._index.get((category, item, variant), -1)
+
+    def to_frame(self):
+        """The catalog as a DataFrame with a ``row`` column holding each entry's index (cached)."""
+        if self._frame is None:
+            self._frame = pd.DataFrame({
+                "row": np.arange(len(self), dtype=np.int64),
+                "category": self.category, "item": self.item, "variant": self.variant,
+                "co2_kg": self.co2, "co2_regular": self.co2_regular, "price": self.price, "eco": self.eco,
+            })
+        return self._frame
+
+
+@functools.lru_cache(maxsize=None)
+def load_catalog(path=DEFAULT_PATH):
+    path = Path(path)
+    loader = LOADERS.get(path.suffix.lower())
+    if loader is None:
+        raise ValueError(f"No catalog loader for '{path.suffix}' files")
+    return EmissionCatalog(loader(path))
@@ -0,0 +1,183 @@
+"""Impact certificate rendering: static template drawn once, variable fields per certificate.
+
+Batch mode renders a table of certificates across a process pool::
+
+    python -m ecogighub.certificates employees.csv -o certificates.zip
+"""
+import argparse
+import csv
+import functools
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as _date, datetime
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+SIZE = (900, 636)
+BACKGROUND = (248, 252, 248)
+TEXT = (0, 100, 0)
+
+
+@functools.lru_cache(maxsize=None)
+def load_fonts():
+    """(title, body) fonts, loaded once per process."""
+    try:
+        return ImageFont.truetype("arialbd.ttf", 48), ImageFont.truetype("arial.ttf", 28)
+    except OSError:
+        font = ImageFont.load_default()
+        return font, font
+
+
+@functools.lru_cache(maxsize=None)
+def template():
+    """Background with the title and closing line already drawn; callers must copy it."""
+    font_title, font_body = load_fonts()
+    img = Image.new("RGB", SIZE, color=BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    draw.text((80, 100), "EcoGigHub Impact Certificate", fill=(20, 90, 50), font=font_title)
+    draw.text((80, 460), "Thank you for choosing sustainability!", fill=(0, 120, 0), font=font_body)
+    return img
+
+
+def render(trees, co2_kg, provider, issued, recipient=None):
+    """Certificate image for already-normalized fields (``co2_kg`` whole kg, ``issued`` a date)."""
+    _, font_body = load_fonts()
+    img = template().copy()
+    draw = ImageDraw.Draw(img)
+    if recipient:
+        draw.text((80, 160), f"Awarded to: {recipient}", fill=(20, 90, 50), font=font_body)
+    draw.text((80, 200), f"Trees Planted: {trees}", fill=TEXT, font=font_body)
+    draw.text((80, 260), f"CO₂ Saved: {co2_kg:,} kg", fill=TEXT, font=font_body)
+    draw.text((80, 320), f"Provider: {provider}", fill=TEXT, font=font_body)
+    draw.text((80, 380), f"Date: {issued:%B %d, %Y}", fill=TEXT, font=font_body)
+    return img
+
+
+@functools.lru_cache(maxsize=256)
+def _pdf(trees, co2_kg, provider, issued, recipient=None):
+    buf = BytesIO()
+    render(trees, co2_kg, provider, issued, recipient).save(buf, format="PDF")
+    return buf.getvalue()
+
+
+def certificate_pdf(trees, total_save, provider, issued=None, recipient=None):
+    """PDF bytes for a certificate, cached by (trees, whole kg saved, provider, date, recipient)."""
+    return _pdf(int(trees), int(round(total_save)), str(provider), issued or _date.today(), recipient or None)
+
+
+# -------------------------------------------------
+# BATCH
+# -------------------------------------------------
+BATCH_FIELDS = ("recipient", "trees", "co2_saved", "provider", "date")
+
+
+def _as_date(value):
+    if value is None or value == "":
+        return _date.today()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, _date):
+        return value
+    return datetime.fromisoformat(str(value)).date()
+
+
+def _normalize(row):
+    """``(trees, co2_kg, provider, issued, recipient)`` from a mapping with :data:`BATCH_FIELDS`."""
+    return (int(float(row["trees"] or 0)), int(round(float(row["co2_saved"] or 0))), str(row["provider"]),
+            _as_date(row.get("date")), str(row.get("recipient") or "") or None)
+
+
+def _page_jpeg(args):
+    buf = BytesIO()
+    render(*args).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _file_pdf(args):
+    return _pdf(*args)
+
+
+def _assemble_pdf(jpeg_pages, size=SIZE):
+    """Multi-page PDF embedding each JPEG page as-is (no re-encode), one 72-dpi page per image."""
+    w, h = size
+    out = BytesIO()
+    offsets = []
+
+    def obj(body):
+        offsets.append(out.tell())
+        out.write(f"{len(offsets)} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    out.write(b"%PDF-1.4\n")
+    n = len(jpeg_pages)
+    # objects: 1 catalog, 2 page tree, then (page, image, content) per page
+    kids = " ".join(f"{3 + 3 * i} 0 R" for i in range(n))
+    obj(b"<< /Type /Catalog /Pages 2 0 R >>")
+    obj(f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode())
+    content = f"q {w} 0 0 {h} 0 0 cm /Im0 Do Q".encode()
+    for i, jpeg in enumerate(jpeg_pages):
+        page, image, stream = 3 + 3 * i, 4 + 3 * i, 5 + 3 * i
+        obj(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {w} {h}] /Resources << /XObject << /Im0 {image} 0 R >> >>"
+            f" /Contents {stream} 0 R >>".encode())
+        obj(f"<< /Type /XObject /Subtype /Image /Width {w} /Height {h} /ColorSpace /DeviceRGB /BitsPerComponent 8"
+            f" /Filter /DCTDecode /Length {len(jpeg)} >>\nstream\n".encode() + jpeg + b"\nendstream")
+        obj(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+    out.write("".join(f"{o:010d} 00000 n \n" for o in offsets).encode())
+    out.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_")[:60] or "certificate"
+
+
+def render_batch(rows, output="pdf", workers=None, chunksize=8):
+    """Render many certificates and return the bytes of one multi-page PDF or a zip of PDFs.
+
+    ``rows`` is an iterable of mappings (or a DataFrame) with :data:`BATCH_FIELDS`.
+    Pages are drawn in parallel across ``workers`` processes (default: CPU count);
+    small batches are drawn in-process, where pool start-up would dominate.
+    """
+    if output not in ("pdf", "zip"):
+        raise ValueError(f"Unknown batch output '{output}' (use 'pdf' or 'zip')")
+    if hasattr(rows, "to_dict"):
+        rows = rows.to_dict("records")
+    jobs = [_normalize(r) for r in rows]
+    fn = _page_jpeg if output == "pdf" else _file_pdf
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 32:
+        results = list(map(fn, jobs))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(fn, jobs, chunksize=chunksize))
+    if output == "pdf":
+        return _assemble_pdf(results)
+    buf = BytesIO()
+    # PDF pages are already compressed, so store them rather than deflate again
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for i, (job, pdf) in enumerate(zip(jobs, results), 1):
+            zf.writestr(f"{i:04d}_{_slug(job[4] or 'certificate')}.pdf", pdf)
+    return buf.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render certificates for every row of a CSV "
+                                                 f"with columns {', '.join(BATCH_FIELDS)}.")
+    parser.add_argument("table")
+    parser.add_argument("-o", "--output", required=True, help="out.pdf (one multi-page PDF) or out.zip")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    with open(args.table, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    data = render_batch(rows, "zip" if args.output.endswith(".zip") else "pdf", args.workers)
+    with open(args.output, "wb") as f:
+        f.write(data)
+    print(f"Wrote {len(rows)} certificates to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
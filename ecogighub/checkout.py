@@ -0,0 +1,91 @@
+"""Lazy Stripe Checkout links for basket rows."""
+from .cache import TTLCache
+
+# Stripe Checkout Sessions expire 24h after creation; stop handing out a URL
+# an hour before that so a user never lands on an expired page.
+CHECKOUT_TTL = 23 * 3600
+
+
+def checkout_key(name, variant, qty, price, email):
+    return (str(name), str(variant), int(qty), round(float(price), 2), (email or "").strip().lower())
+
+
+class CheckoutLinks:
+    """Memoizes Checkout Session URLs per (item, variant, qty, price, email).
+
+    A Checkout Session can only be paid once, so keep one instance per visitor
+    (e.g. in ``st.session_state``), never one shared by everyone.
+    Nothing is created until :meth:`create` is called for a row; :meth:`peek`
+    only reports a URL that already exists, so rendering stays network-free.
+    """
+
+    def __init__(self, create_fn, ttl=CHECKOUT_TTL):
+        self._create = create_fn
+        self._cache = TTLCache(ttl)
+
+    def peek(self, name, variant, qty, price, email=""):
+        return self._cache.get(checkout_key(name, variant, qty, price, email))
+
+    def peek_many(self, names, variants, qtys, prices, email=""):
+        """:meth:`peek` for parallel columns; ``None`` where no URL exists."""
+        return [self.peek(*row, email) for row in zip(names, variants, qtys, prices)]
+
+    def create(self, name, variant, qty, price, email=""):
+        key = checkout_key(name, variant, qty, price, email)
+        return self._cache.get_or_create(key, lambda: self._create(name, variant, int(qty), price, email))
+
+
+PAID, EXPIRED = "paid", "expired"
+TERMINAL_STATUSES = (PAID, EXPIRED)
+
+
+def session_status(session):
+    """Collapse a Checkout Session into ``paid``, ``expired`` or its (non-terminal) payment status."""
+    if session.payment_status in ("paid", "no_payment_required"):
+        return PAID
+    if session.status == "expired":
+        return EXPIRED
+    return session.payment_status
+
+
+def session_details(session):
+    """``{"status", "metadata", "email"}`` of a Checkout Session as plain data."""
+    metadata = getattr(session, "metadata", None) or {}
+    metadata = metadata.to_dict() if hasattr(metadata, "to_dict") else dict(metadata)
+    customer = getattr(session, "customer_details", None)
+    email = metadata.get("email") or getattr(customer, "email", None) or ""
+    return {"status": session_status(session), "metadata": metadata, "email": email}
+
+
+class SessionVerifier:
+    """Process-wide cache of Checkout Session verification results.
+
+    Each result keeps the session's status plus the metadata it was paid with
+    (see :func:`session_details`), so fulfillment uses what was actually bought.
+    Terminal statuses (``paid``/``expired``) can never change, so they are kept
+    for the life of the process; anything else is re-checked after ``pending_ttl``
+    seconds. Lookup errors are not cached.
+    """
+
+    def __init__(self, retrieve, pending_ttl=15, maxsize=10000):
+        self._retrieve = retrieve
+        self._final = TTLCache(ttl=None, maxsize=maxsize)
+        self._pending = TTLCache(ttl=pending_ttl, maxsize=maxsize)
+
+    def details(self, session_id):
+        details = self._final.get(session_id) or self._pending.get(session_id)
+        if details is not None:
+            return details
+        try:
+            details = session_details(self._retrieve(session_id))
+        except Exception:
+            return None
+        cache = self._final if details["status"] in TERMINAL_STATUSES else self._pending
+        return cache.set(session_id, details)
+
+    def status(self, session_id):
+        details = self.details(session_id)
+        return details and details["status"]
+
+    def is_paid(self, session_id):
+        return self.status(session_id) == PAID
@@ -0,0 +1,72 @@
+"""Calculation core shared by the Streamlit app and the headless API."""
+from .badges import BadgeEngine
+from .basket import ColumnarBasket
+
+TREE_CO2_YEAR = 20.0  # kg CO₂ one tree absorbs per year
+
+# -------------------------------------------------
+# BADGES SYSTEM
+# -------------------------------------------------
+BADGES = [
+    {"name": "First Step", "icon": "Leaf", "metric": "co2_saved", "threshold": 10, "desc": "Saved 10 kg CO₂"},
+    {"name": "Eco Warrior", "icon": "trophy", "metric": "co2_saved", "threshold": 100, "desc": "Saved 100 kg CO₂"},
+    {"name": "Tree Hugger", "icon": "tree", "metric": "trees_planted", "threshold": 5, "desc": "Planted 5 trees"},
+    {"name": "Carbon Killer", "icon": "fire", "metric": "co2_saved", "threshold": 1000, "desc": "Saved 1 ton CO₂"},
+    {"name": "Viral Hero", "icon": "share", "metric": "shares", "threshold": 3, "desc": "Invited 3 friends"},
+]
+
+BADGE_ENGINE = BadgeEngine(BADGES)
+
+
+def check_badges(total_save, trees_planted, shares=0, **metrics):
+    """Badges earned for the given CO₂ saved, trees planted, shares and any extra metrics (e.g. ``streak``)."""
+    return BADGE_ENGINE.evaluate({"co2_saved": total_save, "trees_planted": trees_planted, "shares": shares, **metrics})
+
+
+# -------------------------------------------------
+# FOOTPRINT
+# -------------------------------------------------
+def tree_equivalents(co2_kg):
+    """Trees needed for a year to absorb ``co2_kg``."""
+    return co2_kg / TREE_CO2_YEAR
+
+
+def resolve(catalog, item, variant, category=None):
+    """Catalog row for an item/variant (searching every category when none is given), or ``-1``."""
+    for cat in ([category] if category else catalog.categories()):
+        row = catalog.lookup(cat, item, variant)
+        if row >= 0:
+            return row
+    return -1
+
+
+def basket_from_lines(catalog, lines):
+    """Build a basket from ``{"category"?, "item", "variant", "quantity"}`` mappings.
+
+    Returns ``(basket, unknown)`` where ``unknown`` lists the indexes of lines
+    that are not in the catalog or have a non-positive quantity.
+    """
+    basket = ColumnarBasket(catalog, capacity=len(lines) or 1)
+    unknown = []
+    for i, line in enumerate(lines):
+        row = resolve(catalog, line.get("item"), line.get("variant"), line.get("category"))
+        qty = int(line.get("quantity", 1) or 0)
+        if row < 0 or qty <= 0:
+            unknown.append(i)
+        else:
+            basket.add(row, qty)
+    return basket, unknown
+
+
+def footprint(catalog, lines, shares=0):
+    """Per-line and total footprint of a basket, plus tree equivalents and earned badges."""
+    basket, unknown = basket_from_lines(catalog, lines)
+    total_reg, total_eco, total_save, total_money = basket.totals()
+    trees = tree_equivalents(total_save)
+    return {
+        "lines": basket.to_frame().to_dict("records"),
+        "unknown": unknown,
+        "totals": {"co2_regular": total_reg, "co2_eco": total_eco, "savings": total_save, "total_usd": total_money},
+        "trees": round(trees, 2),
+        "badges": [b["name"] for b in check_badges(total_save, int(trees), shares)],
+    }
@@ -0,0 +1,172 @@
+"""Once-only fulfillment of paid Stripe sessions with the tree/offset providers."""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+PENDING, DONE, FAILED = "pending", "done", "failed"
+# Providers whose orders carry an idempotency key, so re-posting an orphaned claim cannot order twice.
+IDEMPOTENT_PROVIDERS = ("Waldonia",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fulfillments (
+    session_id TEXT PRIMARY KEY,
+    provider   TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    request    TEXT,
+    result     TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner      TEXT
+)
+"""
+
+
+class FulfillmentLedger:
+    """SQLite ledger with one row per Stripe Checkout ``session_id``.
+
+    :meth:`fulfill` claims the session with an ``INSERT OR IGNORE`` before calling
+    the provider, so the order is posted at most once even if several reruns,
+    tabs or processes race on the same session. Repeat calls return the stored
+    record (``pending`` while the first call is in flight, then ``done`` or
+    ``failed``) and never post again.
+
+    A claim records its owner and time. If the owner dies before finishing, the
+    row would stay ``pending`` forever, so a caller passing ``stale_after`` may
+    take over a claim older than that; when the call is not ``resumable`` (the
+    provider has no idempotency key) the stale claim is marked ``failed`` for
+    manual handling instead. A ``failed`` row of a resumable order can be put
+    back with :meth:`reopen` and is then taken over by the next caller.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(fulfillments)")}
+            if "owner" not in columns:
+                conn.execute("ALTER TABLE fulfillments ADD COLUMN owner TEXT")
+
+    def _conn(self):
+        # sqlite3 connections cannot be shared across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def get(self, session_id):
+        row = self._conn().execute("SELECT * FROM fulfillments WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record["request"] = json.loads(record["request"]) if record["request"] else None
+        record["result"] = json.loads(record["result"]) if record["result"] else None
+        return record
+
+    @staticmethod
+    def _owner():
+        return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+    def claim(self, session_id, provider, request=None):
+        """Insert a ``pending`` row; ``True`` only for the caller that created it."""
+        now = time.time()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO fulfillments"
+                " (session_id, provider, status, request, result, created_at, updated_at, owner)"
+                " VALUES (?, ?, ?, ?, NULL, ?, ?, ?)",
+                (session_id, provider, PENDING, json.dumps(request), now, now, self._owner()),
+            )
+        return cur.rowcount == 1
+
+    def take_over(self, session_id, stale_after):
+        """Re-claim a reopened or ``stale_after``-seconds-old ``pending`` row; ``True`` for one caller only."""
+        now = time.time()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE fulfillments SET owner = ?, updated_at = ?"
+                " WHERE session_id = ? AND status = ? AND (owner IS NULL OR updated_at < ?)",
+                (self._owner(), now, session_id, PENDING, now - stale_after),
+            )
+        return cur.rowcount == 1
+
+    def abandon(self, session_id, reason, stale_after=0):
+        """Mark a ``pending`` row (untouched for ``stale_after`` seconds) ``failed`` with ``reason``."""
+        now = time.time()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE fulfillments SET status = ?, result = ?, updated_at = ?"
+                " WHERE session_id = ? AND status = ? AND updated_at <= ?",
+                (FAILED, json.dumps({"error": reason}), now, session_id, PENDING, now - stale_after),
+            )
+        return cur.rowcount == 1
+
+    def reopen(self, session_id):
+        """Put a ``failed`` row back to ``pending`` with no owner, for :meth:`take_over` to retry."""
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE fulfillments SET status = ?, result = NULL, updated_at = ?, owner = NULL"
+                " WHERE session_id = ? AND status = ?",
+                (PENDING, time.time(), session_id, FAILED),
+            )
+        return cur.rowcount == 1
+
+    def finish(self, session_id, result):
+        status = DONE if result else FAILED
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE fulfillments SET status = ?, result = ?, updated_at = ? WHERE session_id = ?",
+                (status, json.dumps(result), time.time(), session_id),
+            )
+        return status
+
+    def fulfill(self, session_id, provider, request, call, stale_after=None, resumable=False):
+        """Run ``call()`` once per ``session_id`` and return the ledger record.
+
+        With ``stale_after``, a ``pending`` claim older than that many seconds is
+        taken over when ``resumable``, and marked ``failed`` otherwise.
+        """
+        claimed = self.claim(session_id, provider, request)
+        if not claimed and stale_after is not None:
+            if resumable:
+                claimed = self.take_over(session_id, stale_after)
+            else:
+                self.abandon(session_id, "claim orphaned before the provider answered; check the order manually",
+                             stale_after)
+        if claimed:
+            try:
+                result = call()
+            except Exception:
+                result = None
+            self.finish(session_id, result)
+        return self.get(session_id)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def plan_order(api, trees, offset_tco2, email=""):
+    """Map a checkout's choices onto ``(provider, request)`` for :func:`place_order`."""
+    trees = int(float(trees or 0))
+    offset_tco2 = float(offset_tco2 or 0)
+    if "Waldonia" in api:
+        return "Waldonia", {"trees": trees, "note": "Via EcoGigHub", "metadata": {"email": email}}
+    tonnes = trees / 333 if trees > 0 else offset_tco2
+    return "Ecologi", {"tonnes": tonnes, "action": "trees" if trees > 0 else "offset"}
+
+
+def place_order(session_id, provider, request, waldonia, ecologi):
+    """Post one provider order; the Stripe session id doubles as Waldonia's idempotency key."""
+    if provider == "Waldonia":
+        return waldonia.plant_trees(request["trees"], request["note"], request["metadata"], f"order_{session_id}")
+    return ecologi.offset(request["tonnes"], request["action"])
@@ -0,0 +1,121 @@
+"""Durable SQLite job queue shared by the webhook receiver and fulfillment workers."""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    key          TEXT NOT NULL UNIQUE,
+    kind         TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until  REAL,
+    error        TEXT,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+"""
+
+
+class JobQueue:
+    """At-least-once job queue stored in SQLite.
+
+    Jobs are deduplicated by ``key`` (e.g. the Stripe session id), so a webhook
+    delivered twice enqueues one job. :meth:`claim` leases a job for ``lease``
+    seconds; a worker that dies mid-job lets the lease lapse and the job is
+    handed out again, with ``attempts`` counting every claim so callers can
+    give up. Handlers must therefore be idempotent: the fulfillment ledger
+    posts each order once and takes over (or fails) claims older than the
+    lease that a dead worker left behind.
+    """
+
+    def __init__(self, path, lease=300):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease = lease
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, key, kind, payload, delay=0):
+        """Add a job; returns ``False`` if a job with this ``key`` already exists."""
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT OR IGNORE INTO jobs (key, kind, payload, status, available_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, kind, json.dumps(payload), QUEUED, now + delay, now, now),
+        )
+        return cur.rowcount == 1
+
+    def claim(self, kinds=None):
+        """Lease the oldest ready job (optionally only of ``kinds``); ``None`` if there is none."""
+        now = time.time()
+        where = "((status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?))"
+        args = [QUEUED, now, RUNNING, now]
+        if kinds:
+            where += f" AND kind IN ({','.join('?' * len(kinds))})"
+            args += list(kinds)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(f"SELECT * FROM jobs WHERE {where} ORDER BY available_at, id LIMIT 1", args).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, now + self.lease, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        return job
+
+    def complete(self, job_id):
+        self._set(job_id, DONE)
+
+    def fail(self, job_id, error, retry_in=None):
+        """Record a failure; with ``retry_in`` the job is re-queued after that many seconds."""
+        if retry_in is None:
+            self._set(job_id, FAILED, error=error)
+        else:
+            self._set(job_id, QUEUED, error=error, available_at=time.time() + retry_in)
+
+    def get(self, key):
+        row = self._conn().execute("SELECT * FROM jobs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def counts(self):
+        return dict(self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def _set(self, job_id, status, error=None, available_at=None):
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, error = ?, lease_until = NULL,"
+            " available_at = COALESCE(?, available_at), updated_at = ? WHERE id = ?",
+            (status, error, available_at, now, job_id),
+        )
@@ -0,0 +1,277 @@
+"""Leaderboard reads shared by every session in the process."""
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+LEADERBOARD_COLUMNS = ("user_name", "co2_saved", "trees_planted")
+
+
+def _quote(value):
+    """Quote a value for a PostgREST ``or=(...)`` filter so commas/parentheses in names are safe."""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+class LeaderboardRepository:
+    """Leaderboard queries that only pull the columns and rows the UI shows.
+
+    Rows are ordered by ``co2_saved`` descending with ``user_name`` as a tiebreaker,
+    and pages are addressed by a keyset cursor ``(co2_saved, user_name)`` taken
+    from the last row of the previous page, so deep pages cost the same as page one.
+    """
+
+    def __init__(self, client, table="leaderboard"):
+        self.client = client
+        self.table = table
+
+    def _select(self, *columns, **kwargs):
+        return self.client.table(self.table).select(*(columns or LEADERBOARD_COLUMNS), **kwargs)
+
+    def page(self, limit=10, after=None):
+        """Return ``(rows, next_cursor)``; ``next_cursor`` is ``None`` on the last page."""
+        query = self._select()
+        if after is not None:
+            score, name = after
+            query = query.or_(f"co2_saved.lt.{score},and(co2_saved.eq.{score},user_name.gt.{_quote(name)})")
+        rows = query.order("co2_saved", desc=True).order("user_name").limit(limit).execute().data or []
+        cursor = (rows[-1]["co2_saved"], rows[-1]["user_name"]) if len(rows) == limit else None
+        return rows, cursor
+
+    def rank_for(self, co2_saved):
+        """1-based rank a score would hold, from one ``count=exact`` head request (no rows fetched)."""
+        response = self._select("user_name", count="exact", head=True).gt("co2_saved", co2_saved).execute()
+        return (response.count or 0) + 1
+
+    def rank_of(self, user_name):
+        """Rank of a stored user, or ``None`` if they have not claimed one yet."""
+        rows = self._select("co2_saved").eq("user_name", user_name).limit(1).execute().data
+        return self.rank_for(rows[0]["co2_saved"]) if rows else None
+
+
+class LeaderboardCache:
+    """TTL cache around a leaderboard query with stale-while-revalidate refresh.
+
+    Within ``ttl`` seconds of the last fetch :meth:`get` returns the stored rows.
+    For a further ``stale_ttl`` seconds it still returns them immediately but starts
+    one background refresh; after that (or after :meth:`invalidate`) callers fetch
+    synchronously. Fetches are single-flight: one runs at a time and callers that
+    queued behind it reuse its rows, so a burst of reruns after an invalidation
+    costs one query. A failed refresh keeps serving the last good rows and
+    counts as a fetch for the next ``ttl`` seconds, so an outage costs one
+    query per ``ttl`` rather than one per call.
+    """
+
+    def __init__(self, fetch, ttl=30, stale_ttl=300, clock=time.monotonic):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._rows = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+        self._generation = 0
+
+    def get(self):
+        with self._lock:
+            age = None if self._fetched_at is None else self._clock() - self._fetched_at
+            if age is not None and age < self.ttl:
+                return self._rows
+            if age is not None and age < self.ttl + self.stale_ttl:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, args=(self._generation,),
+                                     name="leaderboard-refresh", daemon=True).start()
+                return self._rows
+        with self._fetch_lock:
+            with self._lock:
+                # another caller may have fetched while this one waited
+                if self._fetched_at is not None and self._clock() - self._fetched_at < self.ttl:
+                    return self._rows
+            return self._fetch_sync()
+
+    def _fetch_sync(self):
+        generation = self._generation
+        try:
+            return self._store(self._fetch())
+        except Exception:
+            if self._rows is None:
+                raise
+            log.warning("Leaderboard fetch failed; serving stale rows", exc_info=True)
+            return self._retry_later(generation)
+
+    def invalidate(self):
+        """Forget freshness so the next :meth:`get` re-reads (used after a rank is claimed)."""
+        with self._lock:
+            self._fetched_at = None
+            self._generation += 1
+
+    def _store(self, rows, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                # invalidated while this refresh was in flight; its rows may predate the change
+                return self._rows
+            self._rows = list(rows or [])
+            self._fetched_at = self._clock()
+            return self._rows
+
+    def _retry_later(self, generation):
+        # keep the current rows for another ``ttl`` before the next attempt
+        with self._lock:
+            if generation == self._generation:
+                self._fetched_at = self._clock()
+            return self._rows
+
+    def _refresh(self, generation):
+        try:
+            with self._fetch_lock:
+                self._store(self._fetch(), generation)
+        except Exception:
+            log.warning("Background leaderboard refresh failed", exc_info=True)
+            self._retry_later(generation)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+def _rank_key(row):
+    return (-row["co2_saved"], row["user_name"])
+
+
+class LeaderboardWriter:
+    """Write-behind queue for rank claims.
+
+    :meth:`claim` only records the claim in memory, coalesced per ``user_name``
+    (the highest ``co2_saved`` wins). A daemon thread hands the pending claims to
+    ``upsert_many(rows)`` as one bulk upsert every ``flush_interval`` seconds, or
+    sooner once ``max_batch`` users are waiting. Until then :meth:`overlay` lets
+    readers show the claims optimistically. Failed flushes are re-queued; when
+    one half of a failed batch goes through, the other half is bisected down to
+    the offending rows, and a row that fails on its own ``max_failures`` times
+    is dropped so it cannot hold back everyone else's claims.
+    """
+
+    def __init__(self, upsert_many, flush_interval=2.0, max_batch=200, on_flush=None, max_failures=5):
+        self._upsert_many = upsert_many
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_failures = max_failures
+        self._on_flush = on_flush
+        self._pending = {}
+        self._failures = {}  # user_name -> flushes the row has failed on its own
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="leaderboard-writer", daemon=True)
+        self._thread.start()
+
+    def claim(self, user_name, co2_saved, trees_planted):
+        row = {"user_name": user_name, "co2_saved": co2_saved, "trees_planted": trees_planted}
+        with self._lock:
+            if self._merge(row):
+                self._failures.pop(user_name, None)  # a new claim gets a fresh start
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wake.set()
+        return row
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def overlay(self, rows, limit=None):
+        """``rows`` (ordered like the leaderboard) with pending claims applied on top."""
+        pending = self.pending()
+        if not pending:
+            return rows
+        merged = {r["user_name"]: r for r in rows}
+        for name, claim in pending.items():
+            if name not in merged or claim["co2_saved"] >= merged[name]["co2_saved"]:
+                merged[name] = {**merged.get(name, {}), **claim}
+        ordered = sorted(merged.values(), key=_rank_key)
+        return ordered[:limit or len(rows) or None]
+
+    def flush(self):
+        """Send every pending claim in one upsert; returns how many rows were written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = list(self._pending.values()), {}
+            if not batch:
+                return 0
+            written, failed = self._write(batch)
+            if failed:
+                log.warning("Leaderboard flush of %d claims failed; re-queued", len(failed))
+                with self._lock:
+                    for row in failed:
+                        self._merge(row)
+        if written and self._on_flush:
+            self._on_flush()
+        return written
+
+    def _write(self, batch):
+        """Upsert ``batch``, bisecting failures; returns ``(rows written, rows to re-queue)``."""
+        if self._try(batch):
+            return len(batch), []
+        if len(batch) == 1:
+            return 0, batch
+        return self._bisect(batch)
+
+    def _bisect(self, batch):
+        # ``batch`` failed as a whole; narrow it down unless both halves fail too
+        if len(batch) == 1:
+            return 0, self._failed_alone(batch[0])
+        mid = len(batch) // 2
+        halves = batch[:mid], batch[mid:]
+        ok = [self._try(half) for half in halves]
+        if not any(ok):
+            return 0, batch  # most likely the backend rather than the rows
+        written, failed = 0, []
+        for half, half_ok in zip(halves, ok):
+            w, f = (len(half), []) if half_ok else self._bisect(half)
+            written, failed = written + w, failed + f
+        return written, failed
+
+    def _try(self, rows):
+        try:
+            self._upsert_many(rows)
+        except Exception:
+            log.debug("Leaderboard upsert of %d rows failed", len(rows), exc_info=True)
+            return False
+        with self._lock:
+            for row in rows:
+                self._failures.pop(row["user_name"], None)
+        return True
+
+    def _failed_alone(self, row):
+        # only reached once other rows of the same flush went through
+        name = row["user_name"]
+        with self._lock:
+            failures = self._failures[name] = self._failures.get(name, 0) + 1
+            if failures < self.max_failures:
+                return [row]
+            del self._failures[name]
+        log.error("Dropping leaderboard claim for %r after %d failed writes", name, failures)
+        return []
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def _merge(self, row):
+        current = self._pending.get(row["user_name"])
+        if current is None or row["co2_saved"] > current["co2_saved"]:
+            self._pending[row["user_name"]] = row
+            return True
+        return False
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
@@ -0,0 +1,116 @@
+"""Pooled HTTP clients for the tree-planting / offset providers (Waldonia, Ecologi)."""
+import asyncio
+import logging
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class ProviderClient:
+    """One keep-alive ``requests.Session`` per provider, with timeouts and bounded retries.
+
+    Failed attempts (connection errors, timeouts, 429/5xx) are retried up to
+    ``retries`` times with full-jitter exponential backoff. Non-idempotent POSTs are
+    only retried when the caller marks them ``idempotent`` (i.e. they carry an
+    idempotency key). Every ``a``-prefixed method runs the blocking call in a worker
+    thread so several provider calls can be awaited concurrently.
+    """
+
+    def __init__(self, base_url, api_key, timeout=10, retries=2, backoff=0.5, pool_size=10, session=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"})
+
+    def request(self, method, path, *, json=None, params=None, timeout=None, idempotent=None):
+        """Send a request and return the final ``requests.Response``; raises the last error if all attempts fail."""
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD", "PUT", "DELETE")
+        attempts = self.retries + 1 if idempotent else 1
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                response = self.session.request(method, url, json=json, params=params, timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if last:
+                    raise
+                log.info("%s %s failed (attempt %d), retrying", method, url, attempt + 1, exc_info=True)
+            else:
+                if response.status_code not in RETRY_STATUSES or last:
+                    return response
+                log.info("%s %s returned %d (attempt %d), retrying", method, url, response.status_code, attempt + 1)
+            time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def json_or_none(self, method, path, ok=(200,), **kwargs):
+        """Decoded JSON body when the status is in ``ok``, else ``None`` (errors are logged, not raised)."""
+        try:
+            response = self.request(method, path, **kwargs)
+        except requests.RequestException:
+            log.warning("%s %s failed", method, path, exc_info=True)
+            return None
+        if response.status_code not in ok:
+            log.warning("%s %s returned %d", method, path, response.status_code)
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    async def arequest(self, method, path, **kwargs):
+        return await asyncio.to_thread(self.request, method, path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class WaldoniaClient(ProviderClient):
+    def plant_trees(self, trees, note, metadata, idempotency_key, project_id=None, timeout=None):
+        if trees <= 0:
+            return None
+        payload = {"tree_count": trees, "idempotency_key": idempotency_key, "note": note, "metadata": metadata}
+        if project_id:
+            payload["project_id"] = project_id
+        return self.json_or_none("POST", "orders", ok=(201,), json=payload, timeout=timeout, idempotent=True)
+
+    def get_projects(self, timeout=None):
+        return self.json_or_none("GET", "projects", timeout=timeout)
+
+    def get_orders(self, timeout=None):
+        return self.json_or_none("GET", "orders", timeout=timeout)
+
+    async def aplant_trees(self, *args, **kwargs):
+        return await asyncio.to_thread(self.plant_trees, *args, **kwargs)
+
+    async def aget_projects(self, **kwargs):
+        return await asyncio.to_thread(self.get_projects, **kwargs)
+
+    async def aget_orders(self, **kwargs):
+        return await asyncio.to_thread(self.get_orders, **kwargs)
+
+
+class EcologiClient(ProviderClient):
+    def __init__(self, base_url, api_key, username, **kwargs):
+        super().__init__(base_url, api_key, **kwargs)
+        self.username = username
+
+    def offset(self, tonnes, action="offset", timeout=None):
+        """``action`` is ``"offset"`` (carbon) or ``"trees"``; Ecologi has no idempotency key, so no retries."""
+        if tonnes <= 0:
+            return None
+        payload = {"tonnes": tonnes, "username": self.username}
+        return self.json_or_none("POST", action, json=payload, timeout=timeout)
+
+    async def aoffset(self, *args, **kwargs):
+        return await asyncio.to_thread(self.offset, *args, **kwargs)
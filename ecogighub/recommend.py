@@ -0,0 +1,50 @@
+"""Budget-constrained recommender: the greenest variant per item that fits a budget."""
+import pandas as pd
+
+from .core import resolve
+from .scenarios import pareto_frontier
+
+MAX_FRONTIER = 2000  # frontier points kept per line before the search is thinned
+
+
+def required_items(lines, catalog):
+    """Baseline basket frame for ``{"item", "quantity", "category"?}`` mappings.
+
+    Returns ``(frame, unknown)`` where ``frame`` has ``Category``/``Item``/
+    ``Variant``/``Quantity`` columns and ``unknown`` lists the indexes of lines
+    that are not in the catalog or have a non-positive quantity.
+    """
+    rows, unknown = [], []
+    for i, line in enumerate(lines):
+        item, qty = line.get("item"), int(line.get("quantity", 1) or 0)
+        variants = [v for cat in ([line["category"]] if line.get("category") else catalog.categories())
+                    for v in catalog.variants(cat, item)]
+        row = resolve(catalog, item, variants[0], line.get("category")) if variants else -1
+        if row >= 0 and qty > 0:
+            base = catalog.baseline[row]
+            rows.append({"Category": catalog.category[base], "Item": item,
+                         "Variant": catalog.variant[base], "Quantity": qty})
+        else:
+            unknown.append(i)
+    return pd.DataFrame(rows, columns=["Category", "Item", "Variant", "Quantity"]), unknown
+
+
+def recommend(frame, catalog, budget, max_points=MAX_FRONTIER):
+    """Pick one variant per basket line to maximize CO₂ saved with ``Total $`` ≤ ``budget``.
+
+    This is a multiple-choice knapsack; it is solved exactly by building the
+    budget-bounded Pareto frontier (see :func:`pareto_frontier`) and taking its
+    highest-savings point. Past ``max_points`` frontier points the search is
+    thinned, so very long baskets get a near-optimal pick in bounded time. Returns ``None`` if even the cheapest picks exceed the
+    budget, else a dict with ``total_usd``, ``savings`` and ``lines`` (``frame``
+    with a ``Recommended`` variant column).
+    """
+    frontier = pareto_frontier(frame, catalog, budget=budget, max_points=max_points)
+    if frontier.empty:
+        return None
+    best = frontier.iloc[-1]
+    return {
+        "total_usd": float(best["Total $"]),
+        "savings": float(best["Savings"]),
+        "lines": frame.assign(Recommended=list(best["Choices"])),
+    }
@@ -0,0 +1,79 @@
+"""HTML for the "Your Eco Choices" table, built column-wise and cached by basket contents."""
+import hashlib
+from html import escape
+
+import numpy as np
+import pandas as pd
+
+from .cache import TTLCache
+
+TABLE_HEAD = ('<table><thead><tr><th>Item</th><th>Choice</th><th>Qty</th><th>Saved</th><th>Price</th>'
+              '<th>Action</th></tr></thead><tbody>')
+TABLE_FOOT = '</tbody></table>'
+SUMMARY_ROW = ('<tr><td colspan="3"><b>{}</b></td><td style="color:#145A32; font-weight:600;">{:,.1f}</td>'
+               '<td><b>${:,.2f}</b></td><td></td></tr>')
+ECO_BADGE = '<span class="eco-badge">Eco</span> '
+REG_BADGE = '<span class="reg-badge">Regular</span> '
+PENDING_BUY = '<span class="buy-btn buy-pending" title="Pick this item under the table to check out">Buy Now</span>'
+# Idle cached tables are dropped after this many seconds.
+RENDER_TTL = 600
+
+TABLE_COLS = ["Item", "Variant", "Quantity", "Savings", "Unit Price", "Total $"]
+
+
+def _escape(col):
+    return (col.astype(str).str.replace("&", "&amp;", regex=False).str.replace("<", "&lt;", regex=False)
+            .str.replace(">", "&gt;", regex=False).str.replace('"', "&quot;", regex=False))
+
+
+def content_hash(frame, eco):
+    """Stable digest of the table columns and eco flags of a basket frame."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(frame[TABLE_COLS], index=False).to_numpy().tobytes())
+    digest.update(np.asarray(eco, dtype=bool).tobytes())
+    return digest.hexdigest()
+
+
+def summary_html(summary):
+    """Footer rows for ``(label, savings, dollars)`` tuples."""
+    return "".join(SUMMARY_ROW.format(escape(label), saved, dollars)
+                   for label, saved, dollars in summary)
+
+
+def eco_table_html(frame, eco, buy_urls, summary=()):
+    """Render basket rows as the eco-choices table.
+
+    ``eco`` flags each row's variant and ``buy_urls`` holds an existing Checkout
+    URL (or ``None``) per row. Cells are built with vectorized column operations
+    and joined once. ``summary`` rows (see :func:`summary_html`) go last.
+    """
+    if frame.empty:
+        return TABLE_HEAD + summary_html(summary) + TABLE_FOOT
+    variant = _escape(frame["Variant"])
+    badge = pd.Series(np.where(eco, ECO_BADGE, REG_BADGE), index=frame.index) + variant
+    urls = pd.Series(buy_urls, index=frame.index, dtype=object)
+    idle = pd.Series(np.where(frame["Unit Price"].to_numpy() > 0, PENDING_BUY, "—"), index=frame.index)
+    buy = ('<a href="' + _escape(urls.fillna("")) + '" target="_blank" class="buy-btn">Buy Now</a>').where(urls.notna(), idle)
+    saved = np.char.mod("%.1f", frame["Savings"].to_numpy(dtype=float))
+    price = np.char.mod("%.2f", frame["Total $"].to_numpy(dtype=float))
+    rows = ("<tr><td>" + _escape(frame["Item"]) + "</td><td>" + badge
+            + "</td><td>" + frame["Quantity"].astype(np.int64).astype(str)
+            + '</td><td style="color:#145A32; font-weight:600;">' + saved
+            + "</td><td>$" + price + "</td><td>" + buy + "</td></tr>")
+    return TABLE_HEAD + "".join(rows.tolist()) + summary_html(summary) + TABLE_FOOT
+
+
+class EcoTableRenderer:
+    """Caches :func:`eco_table_html` per table contents, buy URLs and summary.
+
+    Holds no per-visitor state, so one instance is shared across sessions:
+    identical pages render once, while each caller passes its own Checkout URLs.
+    """
+
+    def __init__(self, ttl=RENDER_TTL, maxsize=256):
+        self._cache = TTLCache(ttl, maxsize)
+
+    def html(self, frame, eco, buy_urls, summary=()):
+        buy_urls, summary = tuple(buy_urls), tuple(summary)
+        key = (content_hash(frame, eco), buy_urls, summary)
+        return self._cache.get_or_create(key, lambda: eco_table_html(frame, eco, buy_urls, summary))
@@ -0,0 +1,81 @@
+"""What-if engine: every variant substitution for a basket, reduced to its Pareto frontier."""
+import numpy as np
+import pandas as pd
+
+
+def _pareto(cost, savings):
+    """Indexes of the points no other point beats on both lower cost and higher savings."""
+    order = np.lexsort((-savings, cost))  # cost ascending, best savings first on ties
+    best = np.maximum.accumulate(savings[order])
+    keep = np.empty(len(order), dtype=bool)
+    keep[0] = True
+    keep[1:] = savings[order][1:] > best[:-1]
+    return order[keep]
+
+
+def line_options(frame, catalog):
+    """Per basket line: ``(variant names, cost, savings)`` of its non-dominated variants."""
+    options = []
+    for cat, item, variant, qty in zip(frame["Category"], frame["Item"], frame["Variant"], frame["Quantity"]):
+        rows = catalog.variant_rows(cat, item)
+        if not len(rows):
+            # not in the catalog: keep the line as it is, contributing nothing
+            options.append((np.array([variant], dtype=object), np.zeros(1), np.zeros(1)))
+            continue
+        cost = np.round(qty * catalog.price[rows], 2)
+        savings = np.round(qty * (catalog.co2_regular[rows] - catalog.co2[rows]), 3)
+        keep = _pareto(cost, savings)
+        options.append((catalog.variant[rows[keep]], cost[keep], savings[keep]))
+    return options
+
+
+def _thin(points, limit):
+    """At most ``limit`` of the cost-sorted ``points``, evenly spaced and keeping both ends."""
+    if limit is None or len(points) <= limit:
+        return points
+    return points[np.unique(np.linspace(0, len(points) - 1, limit).round().astype(int))]
+
+
+def pareto_frontier(frame, catalog, budget=None, max_points=None):
+    """All trade-offs between ``Total $`` and CO₂ saved reachable by re-picking variants.
+
+    ``frame`` is a basket in ``REQUIRED_COLS`` form. Lines are folded in one at a
+    time: the running frontier is combined with a line's options by broadcasting
+    (frontier × options) and immediately pruned back to its Pareto set, so the
+    work grows with the frontier size rather than the number of combinations.
+    With ``budget`` set, points above it are dropped as soon as they appear.
+    With ``max_points`` set, the running frontier is thinned to that many evenly
+    spaced points after each line, trading exactness for bounded work on
+    long baskets; the cheapest and highest-savings points are always kept.
+
+    Returns a DataFrame sorted by cost with ``Total $``, ``Savings`` and
+    ``Choices`` (one variant name per basket line).
+    """
+    options = line_options(frame, catalog)
+    cost = np.zeros(1)
+    savings = np.zeros(1)
+    back = []  # per line: (index into previous frontier, option index) of every kept point
+    for rows, opt_cost, opt_savings in options:
+        c = (cost[:, None] + opt_cost[None, :]).ravel()
+        s = (savings[:, None] + opt_savings[None, :]).ravel()
+        candidates = np.arange(len(c))
+        if budget is not None:
+            candidates = candidates[c <= budget + 1e-9]
+            if not len(candidates):
+                return pd.DataFrame(columns=["Total $", "Savings", "Choices"])
+        keep = _thin(candidates[_pareto(c[candidates], s[candidates])], max_points)
+        back.append(np.divmod(keep, len(opt_cost)))
+        cost, savings = c[keep], s[keep]
+
+    # walk the back-pointers to recover each frontier point's variant per line
+    variants = np.empty((len(cost), len(options)), dtype=object)
+    point = np.arange(len(cost))
+    for line in range(len(options) - 1, -1, -1):
+        prev, opt = back[line][0][point], back[line][1][point]
+        variants[:, line] = options[line][0][opt]
+        point = prev
+    return pd.DataFrame({
+        "Total $": np.round(cost, 2),
+        "Savings": np.round(savings, 3),
+        "Choices": [tuple(v) for v in variants],
+    })
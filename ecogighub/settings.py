@@ -0,0 +1,42 @@
+"""Configuration for the processes that run beside Streamlit (webhook, workers).
+
+Values come from environment variables first, then from the same
+``.streamlit/secrets.toml`` the app reads through ``st.secrets``.
+"""
+import os
+import tomllib
+from pathlib import Path
+
+SECRETS_PATH = Path(os.environ.get("ECOGIGHUB_SECRETS", ".streamlit/secrets.toml"))
+
+
+def load_secrets(path=SECRETS_PATH):
+    try:
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def setting(name, default=None, secrets=None):
+    if name in os.environ:
+        return os.environ[name]
+    secrets = load_secrets() if secrets is None else secrets
+    return secrets.get(name, default)
+
+
+def provider_clients(secrets=None):
+    """``(WaldoniaClient, EcologiClient)`` configured like the Streamlit app's."""
+    from .providers import EcologiClient, WaldoniaClient
+
+    secrets = load_secrets() if secrets is None else secrets
+    waldonia = WaldoniaClient(
+        setting("WALDONIA_BASE", "https://api.waldonia.com/v1", secrets),
+        setting("WALDONIA_API_KEY", "sandbox_key", secrets),
+    )
+    ecologi = EcologiClient(
+        setting("ECOLOGI_BASE", "https://publicapi.ecologi.com/v1", secrets),
+        setting("ECOLOGI_API_KEY", "sandbox_key", secrets),
+        setting("ECOLOGI_USERNAME", "demo_user", secrets),
+    )
+    return waldonia, ecologi
@@ -0,0 +1,144 @@
+"""Stripe webhook receiver that queues tree/offset fulfillment jobs.
+
+Run it beside the Streamlit app and point a Stripe webhook endpoint at it::
+
+    python -m ecogighub.webhook --port 8502
+
+It verifies each event's signature with ``stripe_webhook_secret``, turns paid
+``checkout.session.completed`` events into per-provider ``fulfill.*`` jobs on
+the SQLite queue, and answers immediately; ``python -m ecogighub.worker`` does
+the provider calls.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import stripe
+
+from .fulfillment import plan_order
+from .jobs import JobQueue
+from .settings import setting
+
+log = logging.getLogger(__name__)
+
+MAX_BODY = 1 << 20  # 1 MiB; Stripe events are a few KiB
+
+FULFILL = "fulfill"
+FULFILL_KINDS = (f"{FULFILL}.Waldonia", f"{FULFILL}.Ecologi")
+
+
+def fulfill_kind(provider):
+    """Queue kind for a provider's orders, so workers can pick jobs per provider."""
+    return f"{FULFILL}.{provider}"
+
+
+def enqueue_fulfillment(queue, session_id, api, trees, offset, email=""):
+    provider, _ = plan_order(api, trees, offset, email)
+    return queue.enqueue(session_id, fulfill_kind(provider), {
+        "session_id": session_id, "api": api, "trees": trees, "offset": offset, "email": email,
+    })
+
+
+PAID_EVENTS = ("checkout.session.completed", "checkout.session.async_payment_succeeded")
+
+
+def signature_header(payload, secret, timestamp=None):
+    """A ``Stripe-Signature`` header for ``payload``, for signing test events locally."""
+    timestamp = int(time.time() if timestamp is None else timestamp)
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    digest = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def handle_event(event, queue):
+    """Queue fulfillment for a paid tree/offset checkout; returns ``True`` if a new job was added."""
+    if event["type"] not in PAID_EVENTS:
+        return False
+    session = event["data"]["object"]
+    metadata = session.get("metadata") or {}
+    # item purchases from the eco-choices table carry no provider metadata
+    if session.get("payment_status") not in ("paid", "no_payment_required") or "api" not in metadata:
+        return False
+    email = metadata.get("email") or (session.get("customer_details") or {}).get("email") or ""
+    return enqueue_fulfillment(queue, session["id"], metadata["api"],
+                               metadata.get("trees", 0), metadata.get("offset", 0), email)
+
+
+def make_handler(queue, secret, path="/stripe/webhook"):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def _reply(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/healthz":
+                return self._reply(200, {"ok": True})
+            self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != path:
+                return self._reply(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self.close_connection = True
+                return self._reply(400, {"error": "invalid Content-Length"})
+            if length > MAX_BODY:
+                # the body is left unread, so the connection cannot be reused
+                self.close_connection = True
+                return self._reply(413, {"error": "payload too large"})
+            payload = self.rfile.read(length)
+            try:
+                stripe.Webhook.construct_event(payload, self.headers.get("Stripe-Signature"), secret)
+                # work on plain dicts rather than StripeObjects, whose API differs between library versions
+                event = json.loads(payload)
+            except (ValueError, stripe.SignatureVerificationError) as e:
+                log.warning("Rejected webhook: %s", e)
+                return self._reply(400, {"error": "invalid payload or signature"})
+            queued = handle_event(event, queue)
+            self._reply(200, {"received": True, "queued": queued})
+
+        def log_message(self, fmt, *args):
+            log.info("%s - " + fmt, self.address_string(), *args)
+
+    return WebhookHandler
+
+
+def make_server(queue, secret, host="127.0.0.1", port=8502, path="/stripe/webhook"):
+    return ThreadingHTTPServer((host, port), make_handler(queue, secret, path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--path", default="/stripe/webhook")
+    parser.add_argument("--queue", default=setting("queue_path", ".data/jobs.sqlite3"))
+    args = parser.parse_args(argv)
+    secret = setting("stripe_webhook_secret")
+    if not secret:
+        parser.error("stripe_webhook_secret is not set (env var or .streamlit/secrets.toml)")
+    logging.basicConfig(level=logging.INFO)
+    server = make_server(JobQueue(args.queue), secret, args.host, args.port, args.path)
+    log.info("Listening on http://%s:%d%s", args.host, args.port, args.path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
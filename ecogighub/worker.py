@@ -0,0 +1,192 @@
+"""Fulfillment workers: place the provider orders queued by the webhook receiver or the app.
+
+    python -m ecogighub.worker --workers 4
+"""
+import argparse
+import logging
+import threading
+import time
+
+from .fulfillment import DONE, IDEMPOTENT_PROVIDERS, PENDING, FulfillmentLedger, place_order, plan_order
+from .jobs import JobQueue
+from .settings import load_secrets, provider_clients, setting
+from .webhook import FULFILL_KINDS, fulfill_kind
+
+log = logging.getLogger(__name__)
+
+# first retry delay, doubling per attempt up to MAX_RETRY_SECS
+PENDING_RETRY_SECS = 30
+MAX_RETRY_SECS = 3600
+# Give up on a job after this many claims. 20 retries from 30 s apart upwards
+# outlast the default 300 s job lease, so an orphaned ledger claim is taken over first.
+MAX_ATTEMPTS = 20
+
+# Per provider: max in-flight orders, sustained orders/second and burst size.
+DEFAULT_LIMITS = {
+    "Waldonia": {"concurrency": 2, "rate": 2.0, "burst": 5},
+    "Ecologi": {"concurrency": 2, "rate": 1.0, "burst": 3},
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens/second, holding at most ``capacity``."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Take a token if one is available; otherwise return seconds until the next one."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, stop=None):
+        """Block until a token is available; returns ``False`` if ``stop`` was set first."""
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if stop is not None and stop.wait(wait):
+                return False
+            if stop is None:
+                time.sleep(wait)
+
+
+def fulfill_job(job, ledger, waldonia, ecologi, stale_after=None):
+    """Place the order for one fulfillment job through the ledger and return the ledger record.
+
+    A ledger claim older than ``stale_after`` seconds belongs to a dead worker
+    (see :meth:`FulfillmentLedger.fulfill`).
+    """
+    p = job["payload"]
+    session_id = p["session_id"]
+    provider, request = plan_order(p["api"], p["trees"], p["offset"], p.get("email", ""))
+    return ledger.fulfill(session_id, provider, request,
+                          lambda: place_order(session_id, provider, request, waldonia, ecologi),
+                          stale_after=stale_after, resumable=provider in IDEMPOTENT_PROVIDERS)
+
+
+def retry_job(queue, job, ledger, error):
+    """Re-queue a job with backoff, or after ``MAX_ATTEMPTS`` fail it and its still-pending ledger record."""
+    if job["attempts"] < MAX_ATTEMPTS:
+        queue.fail(job["id"], error, retry_in=min(PENDING_RETRY_SECS * 2 ** (job["attempts"] - 1), MAX_RETRY_SECS))
+        return
+    log.error("Job %s gave up after %d attempts: %s", job["key"], job["attempts"], error)
+    queue.fail(job["id"], f"{error} (gave up after {job['attempts']} attempts)")
+    ledger.abandon(job["payload"]["session_id"], "fulfillment gave up; check the order manually")
+
+
+def run_job(queue, job, ledger, waldonia, ecologi):
+    try:
+        # a claim outliving the job lease cannot still be in flight
+        record = fulfill_job(job, ledger, waldonia, ecologi, stale_after=queue.lease)
+    except Exception as e:
+        log.exception("Job %s crashed", job["key"])
+        retry_job(queue, job, ledger, repr(e))
+        return
+    if record["status"] == DONE:
+        queue.complete(job["id"])
+    elif record["status"] == PENDING:
+        retry_job(queue, job, ledger, "ledger claim held elsewhere")
+    elif record["provider"] in IDEMPOTENT_PROVIDERS:
+        # the idempotency key makes posting the order again safe
+        if job["attempts"] < MAX_ATTEMPTS:
+            ledger.reopen(job["payload"]["session_id"])
+        retry_job(queue, job, ledger, "provider order failed")
+    else:
+        queue.fail(job["id"], "provider order failed")
+
+
+def process_one(queue, ledger, waldonia, ecologi, kinds=FULFILL_KINDS):
+    """Claim and run a single job; returns ``False`` when the queue had nothing ready."""
+    job = queue.claim(kinds)
+    if job is None:
+        return False
+    run_job(queue, job, ledger, waldonia, ecologi)
+    return True
+
+
+class FulfillmentWorkerPool:
+    """Threads that drain the fulfillment queue under per-provider limits.
+
+    A worker only claims jobs for providers that have a free concurrency slot,
+    so a slow provider cannot tie up every thread, and each order waits for a
+    token from that provider's :class:`TokenBucket`. Results land in the
+    :class:`FulfillmentLedger`, which the app polls.
+    """
+
+    def __init__(self, queue, ledger, waldonia, ecologi, workers=4, limits=None, poll=0.5):
+        self.queue = queue
+        self.ledger = ledger
+        self.clients = (waldonia, ecologi)
+        self.workers = workers
+        self.poll = poll
+        limits = limits or DEFAULT_LIMITS
+        self._slots = {p: threading.BoundedSemaphore(lim["concurrency"]) for p, lim in limits.items()}
+        self._buckets = {p: TokenBucket(lim["rate"], lim["burst"]) for p, lim in limits.items()}
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"fulfillment-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            free = [p for p, slot in self._slots.items() if slot.acquire(blocking=False)]
+            job = self.queue.claim([fulfill_kind(p) for p in free]) if free else None
+            provider = job["kind"].split(".", 1)[1] if job else None
+            for p in free:
+                if p != provider:
+                    self._slots[p].release()
+            if job is None:
+                self._stop.wait(self.poll)
+                continue
+            try:
+                if self._buckets[provider].acquire(self._stop):
+                    run_job(self.queue, job, self.ledger, *self.clients)
+                # on shutdown the claimed job's lease lapses and another worker picks it up
+            finally:
+                self._slots[provider].release()
+
+
+def main(argv=None):
+    secrets = load_secrets()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queue", default=setting("queue_path", ".data/jobs.sqlite3", secrets))
+    parser.add_argument("--ledger", default=setting("ledger_path", ".data/fulfillment.sqlite3", secrets))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--poll", type=float, default=0.5)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    waldonia, ecologi = provider_clients(secrets)
+    pool = FulfillmentWorkerPool(JobQueue(args.queue), FulfillmentLedger(args.ledger), waldonia, ecologi,
+                                 workers=args.workers, poll=args.poll).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Columnar basket bookkeeping."""
+import numpy as np
+import pytest
+
+from ecogighub.basket import ColumnarBasket, derive
+from ecogighub.catalog import load_catalog
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_catalog()
+
+
+def column_sums(basket):
+    """Totals recomputed from scratch from the basket's quantities and catalog rows."""
+    catalog, rows = basket.catalog, basket.column("catalog_idx")
+    lines = derive(basket.column("quantity"), catalog.co2_regular[rows], catalog.co2[rows], catalog.price[rows])
+    return tuple(float(col.sum()) for col in lines)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_totals_match_column_sums_after_random_edits(catalog, seed):
+    rng = np.random.default_rng(seed)
+    basket = ColumnarBasket(catalog, capacity=2)
+    for _ in range(200):
+        op = rng.integers(5)
+        if op == 0 or basket.empty:
+            basket.add(int(rng.integers(len(catalog))), int(rng.integers(1, 20)))
+        elif op == 1:
+            k = int(rng.integers(1, 10))
+            basket.extend(rng.integers(len(catalog), size=k), rng.integers(1, 20, size=k))
+        elif op == 2:
+            rows = rng.choice(len(basket), size=int(rng.integers(1, len(basket) + 1)), replace=False)
+            basket.set_quantities(rng.integers(-2, 20, size=len(rows)), rows)
+        elif op == 3:
+            basket.set_quantities(rng.integers(0, 20, size=len(basket)))
+        else:
+            basket.compact()
+        assert basket.totals() == pytest.approx(column_sums(basket), abs=0.011)
+    basket.compact()
+    assert (basket.column("quantity") > 0).all()
+    assert basket.totals() == pytest.approx(column_sums(basket), abs=0.011)
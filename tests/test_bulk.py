@@ -0,0 +1,34 @@
+"""Bulk purchase pricing agrees with the per-line calculator."""
+import pandas as pd
+import pytest
+
+from ecogighub.basket import REQUIRED_COLS
+from ecogighub.bulk import bulk_footprint
+from ecogighub.catalog import load_catalog
+from ecogighub.core import footprint
+
+LINES = [
+    {"category": "Products", "item": "Cotton T-Shirt", "variant": "eco", "quantity": 3},
+    {"category": "Products", "item": "Smartphone", "variant": "refurbished", "quantity": 1},
+    {"category": "Products", "item": "Smartphone", "variant": "gold-plated", "quantity": 1},
+    {"category": "Gig Services", "item": "House Cleaning (1h)", "variant": "green", "quantity": 12},
+    {"category": "Products", "item": "Pair of Jeans", "variant": "regular", "quantity": 0},
+    {"category": "Products", "item": "Cup of Coffee (200ml)", "variant": "fair-trade", "quantity": 250},
+    {"category": "Products", "item": "Bottle of Milk (1L)", "variant": "oat", "quantity": -2},
+]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_catalog()
+
+
+def test_bulk_footprint_matches_footprint(catalog):
+    expected = footprint(catalog, LINES)
+    frame, totals, unmatched = bulk_footprint(pd.DataFrame(LINES), catalog)
+    assert totals == pytest.approx(expected["totals"])
+    pd.testing.assert_frame_equal(frame[REQUIRED_COLS].reset_index(drop=True),
+                                  pd.DataFrame(expected["lines"], columns=REQUIRED_COLS), check_dtype=False)
+    assert list(unmatched.index) == expected["unknown"]
+    assert list(frame["Catalog Row"]) == [catalog.lookup(line["category"], line["item"], line["variant"])
+                                          for i, line in enumerate(LINES) if i not in expected["unknown"]]
@@ -0,0 +1,189 @@
+"""Job queue, fulfillment ledger and worker retries."""
+import pytest
+
+from ecogighub import worker
+from ecogighub.fulfillment import DONE, FAILED, PENDING, FulfillmentLedger
+from ecogighub.jobs import JobQueue
+from ecogighub.webhook import enqueue_fulfillment
+
+
+class Waldonia:
+    def __init__(self):
+        self.orders = []
+
+    def plant_trees(self, trees, note, metadata, idempotency_key, project_id=None):
+        self.orders.append((trees, idempotency_key))
+        return {"order_id": f"o{len(self.orders)}"}
+
+
+class Ecologi:
+    def __init__(self):
+        self.orders = []
+
+    def offset(self, tonnes, action):
+        self.orders.append((tonnes, action))
+        return {"transaction_id": f"t{len(self.orders)}"}
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = FulfillmentLedger(tmp_path / "fulfillment.sqlite3")
+    yield ledger
+    ledger.close()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / "jobs.sqlite3")
+
+
+def age_claims(ledger, seconds):
+    with ledger._conn() as conn:
+        conn.execute("UPDATE fulfillments SET updated_at = updated_at - ?", (seconds,))
+
+
+# -------------------------------------------------
+# LEDGER
+# -------------------------------------------------
+def test_ledger_calls_the_provider_once(ledger):
+    calls = []
+    record = ledger.fulfill("cs_1", "Waldonia", {"trees": 3}, lambda: calls.append(1) or {"order_id": "o1"})
+    again = ledger.fulfill("cs_1", "Waldonia", {"trees": 3}, lambda: calls.append(1) or {"order_id": "o2"})
+    assert calls == [1]
+    assert record["status"] == again["status"] == DONE
+    assert again["result"] == {"order_id": "o1"}
+
+
+def test_ledger_records_a_failed_call(ledger):
+    def boom():
+        raise RuntimeError("provider down")
+    assert ledger.fulfill("cs_1", "Waldonia", {}, boom)["status"] == FAILED
+
+
+def test_fresh_claim_is_left_to_its_owner(ledger):
+    ledger.claim("cs_1", "Waldonia")
+    record = ledger.fulfill("cs_1", "Waldonia", {}, lambda: {"order_id": "o1"}, stale_after=300, resumable=True)
+    assert record["status"] == PENDING
+
+
+def test_orphaned_resumable_claim_is_taken_over(ledger):
+    ledger.claim("cs_1", "Waldonia")
+    age_claims(ledger, 301)
+    record = ledger.fulfill("cs_1", "Waldonia", {}, lambda: {"order_id": "o1"}, stale_after=300, resumable=True)
+    assert record["status"] == DONE
+
+
+def test_orphaned_claim_without_idempotency_is_failed_not_reposted(ledger):
+    calls = []
+    ledger.claim("cs_1", "Ecologi")
+    age_claims(ledger, 301)
+    record = ledger.fulfill("cs_1", "Ecologi", {}, lambda: calls.append(1) or {"x": 1}, stale_after=300)
+    assert calls == []
+    assert record["status"] == FAILED
+    assert "manually" in record["result"]["error"]
+
+
+# -------------------------------------------------
+# QUEUE
+# -------------------------------------------------
+def test_queue_deduplicates_by_key(queue):
+    assert queue.enqueue("cs_1", "fulfill.Waldonia", {"n": 1})
+    assert not queue.enqueue("cs_1", "fulfill.Waldonia", {"n": 2})
+    assert queue.get("cs_1")["payload"] == {"n": 1}
+
+
+def test_queue_leases_a_job_to_one_worker(queue):
+    queue.enqueue("cs_1", "fulfill.Waldonia", {})
+    job = queue.claim()
+    assert job["attempts"] == 1
+    assert queue.claim() is None
+    queue.complete(job["id"])
+    assert queue.counts() == {"done": 1}
+
+
+def test_queue_reissues_a_job_whose_lease_lapsed(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3", lease=-1)
+    queue.enqueue("cs_1", "fulfill.Waldonia", {})
+    queue.claim()
+    assert queue.claim()["attempts"] == 2
+
+
+def test_queue_claims_only_the_requested_kinds(queue):
+    queue.enqueue("cs_1", "fulfill.Ecologi", {})
+    assert queue.claim(["fulfill.Waldonia"]) is None
+    assert queue.claim(["fulfill.Ecologi"])["key"] == "cs_1"
+
+
+# -------------------------------------------------
+# WORKER
+# -------------------------------------------------
+def test_worker_places_each_order_once(queue, ledger):
+    waldonia, ecologi = Waldonia(), Ecologi()
+    enqueue_fulfillment(queue, "cs_1", "Waldonia (Trees)", "7", "0")
+    enqueue_fulfillment(queue, "cs_2", "Ecologi (Offset)", "0", "1.5")
+    while worker.process_one(queue, ledger, waldonia, ecologi):
+        pass
+    assert waldonia.orders == [(7, "order_cs_1")]
+    assert ecologi.orders == [(1.5, "offset")]
+    assert queue.counts() == {"done": 2}
+    assert ledger.get("cs_1")["status"] == ledger.get("cs_2")["status"] == DONE
+
+
+def test_worker_takes_over_an_orphaned_waldonia_claim(queue, ledger):
+    waldonia = Waldonia()
+    enqueue_fulfillment(queue, "cs_1", "Waldonia (Trees)", "7", "0")
+    ledger.claim("cs_1", "Waldonia")
+    age_claims(ledger, queue.lease + 1)
+    assert worker.process_one(queue, ledger, waldonia, Ecologi())
+    assert waldonia.orders == [(7, "order_cs_1")]
+    assert ledger.get("cs_1")["status"] == DONE
+
+
+def test_worker_gives_up_after_max_attempts(queue, ledger, monkeypatch):
+    monkeypatch.setattr(worker, "PENDING_RETRY_SECS", 0)
+    enqueue_fulfillment(queue, "cs_1", "Waldonia (Trees)", "7", "0")
+    ledger.claim("cs_1", "Waldonia")  # held by a live owner for the whole test
+    runs = 0
+    while worker.process_one(queue, ledger, Waldonia(), Ecologi()):
+        runs += 1
+    assert runs == worker.MAX_ATTEMPTS
+    assert queue.get("cs_1")["status"] == "failed"
+    assert ledger.get("cs_1")["status"] == FAILED
+
+
+class Flaky:
+    """A provider stub whose first ``failures`` orders return nothing."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.orders = []
+
+    def plant_trees(self, trees, note, metadata, idempotency_key, project_id=None):
+        self.orders.append((trees, idempotency_key))
+        return None if len(self.orders) <= self.failures else {"order_id": "o1"}
+
+    def offset(self, tonnes, action):
+        self.orders.append((tonnes, action))
+        return None if len(self.orders) <= self.failures else {"transaction_id": "t1"}
+
+
+def test_worker_retries_a_failed_waldonia_order(queue, ledger, monkeypatch):
+    monkeypatch.setattr(worker, "PENDING_RETRY_SECS", 0)
+    waldonia = Flaky(failures=2)
+    enqueue_fulfillment(queue, "cs_1", "Waldonia (Trees)", "7", "0")
+    while worker.process_one(queue, ledger, waldonia, Ecologi()):
+        pass
+    assert waldonia.orders == [(7, "order_cs_1")] * 3
+    assert queue.get("cs_1")["status"] == "done"
+    assert ledger.get("cs_1")["status"] == DONE
+
+
+def test_worker_does_not_retry_a_failed_ecologi_order(queue, ledger, monkeypatch):
+    monkeypatch.setattr(worker, "PENDING_RETRY_SECS", 0)
+    ecologi = Flaky(failures=1)
+    enqueue_fulfillment(queue, "cs_1", "Ecologi (Offset)", "0", "1.5")
+    while worker.process_one(queue, ledger, Waldonia(), ecologi):
+        pass
+    assert len(ecologi.orders) == 1
+    assert queue.get("cs_1")["status"] == "failed"
+    assert ledger.get("cs_1")["status"] == FAILED
@@ -0,0 +1,84 @@
+"""Leaderboard read caching and write-behind flushing."""
+import pytest
+
+from ecogighub.leaderboard import LeaderboardCache, LeaderboardWriter
+
+
+class Table:
+    """An ``upsert_many`` stand-in that rejects any batch containing a ``bad`` user, or everything when ``down``."""
+
+    def __init__(self, bad=()):
+        self.bad = set(bad)
+        self.down = False
+        self.rows = {}
+        self.calls = 0
+
+    def upsert_many(self, rows):
+        self.calls += 1
+        if self.down or any(r["user_name"] in self.bad for r in rows):
+            raise RuntimeError("rejected")
+        self.rows.update((r["user_name"], r) for r in rows)
+
+
+@pytest.fixture
+def table():
+    return Table(bad={"bad"})
+
+
+@pytest.fixture
+def writer(table):
+    writer = LeaderboardWriter(table.upsert_many, flush_interval=3600, max_failures=3)
+    yield writer
+    writer.close()
+
+
+def test_bad_row_does_not_block_the_batch(table, writer):
+    for i in range(10):
+        writer.claim(f"user{i}", i, 0)
+    writer.claim("bad", 1, 0)
+    assert writer.flush() == 10
+    assert set(table.rows) == {f"user{i}" for i in range(10)}
+    assert set(writer.pending()) == {"bad"}
+
+
+def test_bad_row_is_dropped_after_max_failures(table, writer):
+    for attempt in range(writer.max_failures):
+        writer.claim("good", attempt, 0)
+        writer.claim("bad", 1, 0)
+        writer.flush()
+    assert writer.pending() == {}
+    assert "bad" not in table.rows
+
+
+def test_outage_keeps_every_row(table, writer):
+    table.down = True
+    for i in range(8):
+        writer.claim(f"user{i}", i, 0)
+    for _ in range(writer.max_failures + 1):
+        assert writer.flush() == 0
+    assert len(writer.pending()) == 8
+    assert table.calls <= 3 * (writer.max_failures + 1)
+    table.down = False
+    assert writer.flush() == 8
+
+
+def test_failed_fetch_serves_stale_rows_until_ttl():
+    now = [0.0]
+    calls = []
+
+    def fetch():
+        calls.append(now[0])
+        if len(calls) > 1:
+            raise RuntimeError("down")
+        return [{"user_name": "a", "co2_saved": 1, "trees_planted": 0}]
+
+    cache = LeaderboardCache(fetch, ttl=30, stale_ttl=0, clock=lambda: now[0])
+    rows = cache.get()
+    now[0] = 31
+    assert cache.get() == rows
+    now[0] = 40
+    assert cache.get() == rows
+    assert calls == [0, 31]
+    now[0] = 62
+    assert cache.get() == rows
+    assert calls == [0, 31, 62]
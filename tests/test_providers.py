@@ -0,0 +1,113 @@
+"""Provider HTTP clients against a local stand-in server."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ecogighub.providers import EcologiClient, WaldoniaClient
+
+
+class Provider:
+    """Scripted provider: per path, a list of ``(status, body)`` replies, the last one repeating."""
+
+    def __init__(self):
+        self.replies = {}
+        self.delay = 0
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def reply(self, path, body):
+        with self._lock:
+            self.requests.append((path, body))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            replies = self.replies.get(path, [(404, {})])
+            status, payload = replies.pop(0) if len(replies) > 1 else replies[0]
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return status, payload
+
+
+@pytest.fixture
+def provider():
+    provider = Provider()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _handle(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            status, payload = provider.reply(f"{self.command} {self.path}", body)
+            data = json.dumps(payload).encode()
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            except OSError:
+                pass  # the client timed out and hung up
+
+        do_GET = do_POST = _handle
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    provider.url = f"http://127.0.0.1:{server.server_port}/v1"
+    yield provider
+    server.shutdown()
+    server.server_close()
+
+
+def test_waldonia_order_is_retried_on_503(provider):
+    provider.replies["POST /v1/orders"] = [(503, {}), (503, {}), (201, {"order_id": "o1"})]
+    client = WaldoniaClient(provider.url, "key", retries=2, backoff=0)
+    assert client.plant_trees(3, "note", {}, "order_cs_1") == {"order_id": "o1"}
+    bodies = [body for path, body in provider.requests]
+    assert len(bodies) == 3
+    assert {body["idempotency_key"] for body in bodies} == {"order_cs_1"}
+
+
+def test_ecologi_offset_is_not_retried(provider):
+    provider.replies["POST /v1/offset"] = [(503, {}), (201, {"transaction_id": "t1"})]
+    client = EcologiClient(provider.url, "key", "demo", retries=2, backoff=0)
+    assert client.offset(1.5) is None
+    assert provider.requests == [("POST /v1/offset", {"tonnes": 1.5, "username": "demo"})]
+
+
+def test_timeouts_are_retried_for_gets_only(provider):
+    provider.replies["GET /v1/projects"] = [(200, [])]
+    provider.replies["POST /v1/offset"] = [(200, {})]
+    provider.delay = 0.5
+    waldonia = WaldoniaClient(provider.url, "key", timeout=0.1, retries=1, backoff=0)
+    ecologi = EcologiClient(provider.url, "key", "demo", timeout=0.1, retries=1, backoff=0)
+    assert waldonia.get_projects() is None
+    assert ecologi.offset(1.5) is None
+    assert [path for path, _ in provider.requests] == ["GET /v1/projects"] * 2 + ["POST /v1/offset"]
+
+
+def test_async_gets_run_concurrently(provider):
+    provider.replies["GET /v1/projects"] = [(200, [{"id": "p1"}])]
+    provider.replies["GET /v1/orders"] = [(200, [{"id": "o1"}])]
+    provider.delay = 0.3
+    client = WaldoniaClient(provider.url, "key", backoff=0)
+
+    async def fetch_all():
+        return await asyncio.gather(client.aget_projects(), client.aget_orders(),
+                                    client.aget_projects(), client.aget_orders())
+
+    started = time.monotonic()
+    results = asyncio.run(fetch_all())
+    elapsed = time.monotonic() - started
+    assert results == [[{"id": "p1"}], [{"id": "o1"}]] * 2
+    assert provider.max_in_flight > 1
+    assert elapsed < 4 * provider.delay
@@ -0,0 +1,77 @@
+"""What-if frontier and budget recommender against brute force."""
+import itertools
+
+import pandas as pd
+import pytest
+
+from ecogighub.catalog import EmissionCatalog
+from ecogighub.recommend import recommend
+from ecogighub.scenarios import pareto_frontier
+
+CATALOG = EmissionCatalog(pd.DataFrame([
+    ("Products", "Shirt", "regular", 9.0, 13.0),
+    ("Products", "Shirt", "eco", 4.5, 18.0),
+    ("Products", "Shirt", "recycled", 6.0, 11.0),
+    ("Products", "Shoes", "regular", 16.0, 89.0),
+    ("Products", "Shoes", "vegan", 7.0, 99.0),
+    ("Products", "Shoes", "refurbished", 5.0, 140.0),
+    ("Products", "Coffee", "regular", 0.05, 3.0),
+    ("Products", "Coffee", "fair-trade", 0.03, 3.5),
+    ("Gig Services", "Delivery", "van", 2.0, 8.0),
+    ("Gig Services", "Delivery", "electric", 0.4, 9.5),
+    ("Gig Services", "Delivery", "bike", 0.1, 12.0),
+], columns=["category", "item", "variant", "co2_kg", "price"]))
+
+BASKET = pd.DataFrame({
+    "Category": ["Products", "Products", "Products", "Gig Services"],
+    "Item": ["Shirt", "Shoes", "Coffee", "Delivery"],
+    "Variant": ["regular", "regular", "regular", "van"],
+    "Quantity": [3, 1, 20, 4],
+})
+
+
+def every_pick():
+    """``(cost, savings, choices)`` for every combination of variants, the slow way."""
+    lines = []
+    for cat, item, qty in zip(BASKET["Category"], BASKET["Item"], BASKET["Quantity"]):
+        rows = CATALOG.variant_rows(cat, item)
+        lines.append([(CATALOG.variant[r], round(qty * CATALOG.price[r], 2),
+                       round(qty * (CATALOG.co2_regular[r] - CATALOG.co2[r]), 3)) for r in rows])
+    for combo in itertools.product(*lines):
+        yield (round(sum(c for _, c, _ in combo), 2), round(sum(s for _, _, s in combo), 3),
+               tuple(v for v, _, _ in combo))
+
+
+def brute_frontier():
+    picks = {(cost, savings) for cost, savings, _ in every_pick()}
+    return sorted(p for p in picks
+                  if not any(q != p and q[0] <= p[0] and q[1] >= p[1] for q in picks))
+
+
+def test_frontier_matches_brute_force():
+    frontier = pareto_frontier(BASKET, CATALOG)
+    assert list(zip(frontier["Total $"], frontier["Savings"])) == pytest.approx(brute_frontier())
+    picks = {choices: (cost, savings) for cost, savings, choices in every_pick()}
+    for cost, savings, choices in frontier.itertuples(index=False):
+        assert picks[choices] == pytest.approx((cost, savings))
+
+
+def test_thinned_frontier_keeps_both_ends():
+    exact = pareto_frontier(BASKET, CATALOG)
+    thinned = pareto_frontier(BASKET, CATALOG, max_points=3)
+    assert len(thinned) <= 3
+    assert thinned.iloc[0]["Total $"] == exact.iloc[0]["Total $"]
+    assert thinned.iloc[-1]["Savings"] == exact.iloc[-1]["Savings"]
+
+
+@pytest.mark.parametrize("budget", [200, 214, 235, 260, 300, 400])
+def test_recommend_matches_brute_force(budget):
+    fits = [(savings, cost) for cost, savings, _ in every_pick() if cost <= budget]
+    pick = recommend(BASKET, CATALOG, budget)
+    if not fits:
+        assert pick is None
+        return
+    best_savings = max(s for s, _ in fits)
+    assert pick["savings"] == pytest.approx(best_savings)
+    assert pick["total_usd"] <= budget
+    assert list(pick["lines"]["Item"]) == list(BASKET["Item"])
@@ -0,0 +1,110 @@
+"""Signed Stripe events through the webhook receiver into the job queue."""
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from ecogighub.jobs import JobQueue
+from ecogighub.webhook import MAX_BODY, make_server, signature_header
+
+SECRET = "whsec_test"
+
+
+@pytest.fixture
+def webhook(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    server = make_server(queue, SECRET, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/stripe/webhook", queue
+    server.shutdown()
+    server.server_close()
+
+
+def paid_event(session_id="cs_test_1", metadata=None, payment_status="paid", event_type="checkout.session.completed"):
+    metadata = {"api": "Waldonia (Trees)", "trees": "7", "offset": "0", "email": "a@example.com"} if metadata is None else metadata
+    return json.dumps({
+        "id": f"evt_{session_id}", "object": "event", "type": event_type,
+        "data": {"object": {"id": session_id, "object": "checkout.session",
+                            "payment_status": payment_status, "metadata": metadata}},
+    }).encode()
+
+
+def post(url, payload, signature=None):
+    headers = {"Content-Type": "application/json"}
+    if signature is not None:
+        headers["Stripe-Signature"] = signature
+    request = urllib.request.Request(url, data=payload, headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_signed_event_queues_one_job(webhook):
+    url, queue = webhook
+    payload = paid_event()
+    assert post(url, payload, signature_header(payload, SECRET)) == (200, {"received": True, "queued": True})
+    job = queue.get("cs_test_1")
+    assert job["kind"] == "fulfill.Waldonia"
+    assert job["payload"] == {"session_id": "cs_test_1", "api": "Waldonia (Trees)", "trees": "7",
+                              "offset": "0", "email": "a@example.com"}
+
+
+def test_duplicate_delivery_is_deduplicated(webhook):
+    url, queue = webhook
+    payload = paid_event()
+    post(url, payload, signature_header(payload, SECRET))
+    assert post(url, payload, signature_header(payload, SECRET)) == (200, {"received": True, "queued": False})
+    assert queue.counts() == {"queued": 1}
+
+
+@pytest.mark.parametrize("signature", [None, "t=1,v1=deadbeef", "garbage"])
+def test_bad_or_missing_signature_is_rejected(webhook, signature):
+    url, queue = webhook
+    assert post(url, paid_event(), signature)[0] == 400
+    assert queue.counts() == {}
+
+
+def test_signature_from_another_secret_is_rejected(webhook):
+    url, queue = webhook
+    payload = paid_event()
+    assert post(url, payload, signature_header(payload, "whsec_other"))[0] == 400
+    assert queue.counts() == {}
+
+
+@pytest.mark.parametrize("payload", [
+    paid_event(payment_status="unpaid"),
+    paid_event(metadata={}),  # an item purchase from the eco-choices table
+    paid_event(event_type="checkout.session.expired"),
+])
+def test_events_without_a_paid_tree_order_are_ignored(webhook, payload):
+    url, queue = webhook
+    assert post(url, payload, signature_header(payload, SECRET)) == (200, {"received": True, "queued": False})
+    assert queue.counts() == {}
+
+
+def test_offset_orders_go_to_the_ecologi_queue(webhook):
+    url, queue = webhook
+    payload = paid_event("cs_test_2", {"api": "Ecologi (Offset)", "trees": "0", "offset": "1.5"})
+    post(url, payload, signature_header(payload, SECRET))
+    assert queue.get("cs_test_2")["kind"] == "fulfill.Ecologi"
+
+
+@pytest.mark.parametrize("length, status", [(str(MAX_BODY + 1), 413), ("lots", 400), ("-5", 400)])
+def test_oversized_or_malformed_length_is_rejected(webhook, length, status):
+    url, queue = webhook
+    host, port = url.split("/")[2].split(":")
+    conn = http.client.HTTPConnection(host, int(port), timeout=5)
+    # announce the length without sending a body; the receiver must not wait for it
+    conn.putrequest("POST", "/stripe/webhook")
+    conn.putheader("Content-Length", length)
+    conn.endheaders()
+    response = conn.getresponse()
+    assert response.status == status
+    conn.close()
+    assert queue.counts() == {}